@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Обход директории с файлами релизов через os.scandir
+
+Используется и проверкой файлов (scripts/compare_files.py), и страницей
+загрузки, чтобы список файлов строился за один проход. Тип записи
+(файл или папка) берется из DirEntry без отдельного stat на каждый файл,
+а размер и время изменения запрашиваются только при необходимости.
+"""
+
+import os
+from fnmatch import fnmatch
+from typing import List, Optional, Sequence
+
+from .logger_config import get_logger
+debug_logger = get_logger("directory_scanner")
+
+# Глубина обхода по умолчанию: 0 - только файлы самой директории
+# (загрузчик ищет файлы по имени непосредственно в выбранной папке),
+# 1 - плюс подпапки релизов, None - без ограничения
+DEFAULT_SCAN_DEPTH = 0
+
+# Служебные файлы, которые не относятся к релизам
+DEFAULT_IGNORE_PATTERNS = ('.DS_Store', '._*', 'Thumbs.db', 'desktop.ini')
+
+
+class ScannedFile:
+    """Файл, найденный при обходе директории"""
+
+    __slots__ = ('path', 'relative_path', 'name', 'size', 'mtime_ns')
+
+    def __init__(self, path, relative_path, name, size=None, mtime_ns=None):
+        self.path = path
+        # Путь относительно корня обхода; для файлов в корне совпадает с именем
+        self.relative_path = relative_path
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __repr__(self):
+        return f"ScannedFile({self.relative_path!r})"
+
+
+def _is_ignored(name: str, ignore_patterns: Sequence[str]) -> bool:
+    """Проверяет, подходит ли имя под один из шаблонов исключения"""
+    return any(fnmatch(name, pattern) for pattern in ignore_patterns)
+
+
+def scan_directory(directory: str, max_depth: Optional[int] = DEFAULT_SCAN_DEPTH,
+                   ignore_patterns: Sequence[str] = DEFAULT_IGNORE_PATTERNS,
+                   with_stat: bool = False) -> List[ScannedFile]:
+    """
+    Возвращает файлы директории (и подпапок до max_depth уровней)
+
+    Файлы каждой папки идут в порядке os.scandir, затем - файлы ее подпапок.
+    Для плоского обхода порядок совпадает с os.listdir, поэтому результаты
+    сопоставления не зависят от способа получения списка.
+
+    Args:
+        directory: Корневая директория
+        max_depth: Сколько уровней подпапок обходить (0 - без подпапок, None - все)
+        ignore_patterns: Шаблоны fnmatch для имен файлов и папок, которые пропускаются
+        with_stat: Заполнить размер и время изменения файлов
+
+    Returns:
+        list: Найденные файлы (ScannedFile)
+
+    Raises:
+        OSError: Если корневую директорию не удалось прочитать
+    """
+    files = []
+    # Стек папок: (абсолютный путь, относительный путь, глубина)
+    pending = [(directory, '', 0)]
+    while pending:
+        current, relative, depth = pending.pop()
+        subdirectories = []
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if _is_ignored(entry.name, ignore_patterns):
+                        continue
+                    relative_path = os.path.join(relative, entry.name) if relative else entry.name
+                    try:
+                        if entry.is_file():
+                            scanned = ScannedFile(entry.path, relative_path, entry.name)
+                            if with_stat:
+                                # DirEntry кэширует результат stat
+                                stat_result = entry.stat()
+                                scanned.size = stat_result.st_size
+                                scanned.mtime_ns = stat_result.st_mtime_ns
+                            files.append(scanned)
+                        elif (max_depth is None or depth < max_depth) and entry.is_dir(follow_symlinks=False):
+                            subdirectories.append((entry.path, relative_path, depth + 1))
+                    except OSError as e:
+                        debug_logger.warning(f"⚠️ Не удалось прочитать '{entry.path}': {e}")
+        except OSError as e:
+            if current == directory:
+                raise
+            debug_logger.warning(f"⚠️ Не удалось прочитать папку '{current}': {e}")
+            continue
+        # Стек - поэтому подпапки добавляются в обратном порядке
+        pending.extend(reversed(subdirectories))
+    return files
+
+
+def list_subdirectories(directory: str, max_depth: Optional[int] = DEFAULT_SCAN_DEPTH,
+                        ignore_patterns: Sequence[str] = DEFAULT_IGNORE_PATTERNS) -> List[str]:
+    """
+    Возвращает пути подпапок, которые обходит scan_directory с теми же параметрами
+
+    Returns:
+        list: Абсолютные пути подпапок (без самой directory)
+    """
+    directories = []
+    pending = [(directory, 0)]
+    while pending:
+        current, depth = pending.pop()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if not _is_ignored(entry.name, ignore_patterns) and entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                        pending.append((entry.path, depth + 1))
+        except OSError as e:
+            debug_logger.warning(f"⚠️ Не удалось прочитать папку '{current}': {e}")
+    return directories
+
+
+def list_directory_files(directory: str, max_depth: Optional[int] = DEFAULT_SCAN_DEPTH,
+                         ignore_patterns: Sequence[str] = DEFAULT_IGNORE_PATTERNS) -> List[str]:
+    """
+    Возвращает относительные пути файлов директории
+
+    Returns:
+        list: Пути относительно directory (для корня - просто имена файлов)
+    """
+    return [scanned.relative_path for scanned in scan_directory(directory, max_depth, ignore_patterns)]
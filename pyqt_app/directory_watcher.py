@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Наблюдение за директорией с файлами релизов
+
+DirectoryWatcher сообщает о появившихся и удаленных файлах. Основной
+источник событий - QFileSystemWatcher (inotify в Linux, kqueue/FSEvents
+в macOS). Если системное наблюдение недоступно, директория опрашивается
+по таймеру. В обоих случаях список файлов строится через directory_scanner
+и сравнивается с предыдущим, поэтому переименование приходит как удаление
+старого имени и добавление нового.
+"""
+
+from typing import Optional, Sequence
+
+from PyQt6.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+
+from .directory_scanner import (
+    DEFAULT_SCAN_DEPTH, DEFAULT_IGNORE_PATTERNS, list_directory_files, list_subdirectories
+)
+from .logger_config import get_logger
+debug_logger = get_logger("directory_watcher")
+
+# Пауза после события файловой системы перед пересканированием -
+# копирование пачки файлов дает одно обновление вместо десятков
+WATCH_DEBOUNCE_MS = 150
+
+# Интервал опроса директории, если системное наблюдение недоступно
+WATCH_POLL_INTERVAL_MS = 2000
+
+
+class DirectoryWatcher(QObject):
+    """Следит за директорией и сообщает об изменениях списка файлов"""
+
+    # Сигнал изменения: (появившиеся файлы, удаленные файлы) - относительные пути
+    files_changed = pyqtSignal(list, list)
+
+    def __init__(self, directory: str, max_depth: Optional[int] = DEFAULT_SCAN_DEPTH,
+                 ignore_patterns: Sequence[str] = DEFAULT_IGNORE_PATTERNS, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self.max_depth = max_depth
+        self.ignore_patterns = ignore_patterns
+        self.polling = False
+        self._files = []
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._schedule_rescan)
+
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.setInterval(WATCH_DEBOUNCE_MS)
+        self._debounce_timer.timeout.connect(self.rescan)
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(WATCH_POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self.rescan)
+
+    def start(self, known_files: Optional[Sequence[str]] = None):
+        """
+        Запускает наблюдение
+
+        Args:
+            known_files: Список файлов, от которого считать изменения
+                (по умолчанию - текущее содержимое директории)
+        """
+        self._files = list(known_files) if known_files is not None else self._list_files()
+        self._update_watched_directories()
+        if self.polling:
+            self._poll_timer.start()
+            debug_logger.warning(f"⚠️ Системное наблюдение недоступно, опрашиваем директорию: {self.directory}")
+        else:
+            debug_logger.info(f"👀 Наблюдение за директорией: {self.directory}")
+
+    def stop(self):
+        """Останавливает наблюдение"""
+        self._debounce_timer.stop()
+        self._poll_timer.stop()
+        watched = self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        debug_logger.info(f"🛑 Наблюдение остановлено: {self.directory}")
+
+    def _list_files(self):
+        """Текущий список файлов директории"""
+        try:
+            return list_directory_files(self.directory, self.max_depth, self.ignore_patterns)
+        except OSError as e:
+            debug_logger.error(f"❌ Ошибка при чтении директории: {e}")
+            return []
+
+    def _update_watched_directories(self):
+        """Добавляет в наблюдение директорию и ее подпапки в пределах глубины обхода"""
+        directories = {self.directory}
+        if self.max_depth != 0:
+            directories.update(list_subdirectories(self.directory, self.max_depth, self.ignore_patterns))
+
+        watched = set(self._watcher.directories())
+        stale = [path for path in watched if path not in directories]
+        if stale:
+            self._watcher.removePaths(stale)
+        for path in directories - watched:
+            if not self._watcher.addPath(path) and path == self.directory:
+                self.polling = True
+
+    def _schedule_rescan(self, path):
+        """Откладывает пересканирование до окончания серии событий"""
+        self._debounce_timer.start()
+
+    def rescan(self):
+        """Сравнивает текущий список файлов с предыдущим и сообщает о разнице"""
+        files = self._list_files()
+        previous = set(self._files)
+        current = set(files)
+        added = [path for path in files if path not in previous]
+        removed = [path for path in self._files if path not in current]
+        self._files = files
+        if not self.polling and self.max_depth != 0:
+            # Новые подпапки релизов тоже должны попасть в наблюдение
+            self._update_watched_directories()
+        if not added and not removed:
+            return
+        debug_logger.debug(f"📂 Изменения в директории: +{len(added)} / -{len(removed)}")
+        self.files_changed.emit(added, removed)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Чтение нужных столбцов Excel файла релизов (манифеста) с кэшем на диске
+
+Используется проверкой файлов (scripts/compare_files.py) и страницей
+аналитики. Лист читается через openpyxl в режиме read_only (так его
+открывает pandas), и в DataFrame попадают только запрошенные столбцы.
+Прочитанные столбцы сохраняются в директории данных с ключом
+(размер, время изменения, хэш BLAKE2 содержимого файла), поэтому
+повторные чтения того же файла не разбирают его заново.
+"""
+
+import hashlib
+import os
+import pickle
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from .logger_config import get_logger
+from .path_manager import ensure_directory_exists, get_manifest_cache_directory
+debug_logger = get_logger("manifest_loader")
+
+# Лист с релизами в Excel файле
+MANIFEST_SHEET_NAME = 'Лист1'
+
+# Версия формата записей кэша (увеличивается при изменении формата или правил чтения)
+MANIFEST_CACHE_VERSION = 1
+
+# Размер блока чтения при хэшировании файла
+MANIFEST_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _file_digest(path: str) -> str:
+    """Хэш BLAKE2b содержимого файла (hex)"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(MANIFEST_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(cache_directory: str, excel_file_path: str, sheet_name: str) -> str:
+    """Файл кэша для пары (Excel файл, лист)"""
+    key = hashlib.blake2b(f"{os.path.abspath(excel_file_path)}\0{sheet_name}".encode('utf-8'),
+                          digest_size=12).hexdigest()
+    return os.path.join(cache_directory, f"{key}.pkl")
+
+
+def _read_cache(cache_path: str) -> Optional[dict]:
+    """Читает запись кэша; поврежденная или устаревшая запись считается отсутствующей"""
+    try:
+        with open(cache_path, 'rb') as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        debug_logger.warning(f"⚠️ Не удалось прочитать кэш Excel файла: {str(e)}")
+        return None
+    if not isinstance(entry, dict) or entry.get('version') != MANIFEST_CACHE_VERSION:
+        return None
+    return entry
+
+
+def _write_cache(cache_path: str, entry: dict) -> None:
+    """Атомарно записывает запись кэша"""
+    temp_path = f"{cache_path}.tmp"
+    try:
+        ensure_directory_exists(os.path.dirname(cache_path))
+        with open(temp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        debug_logger.warning(f"⚠️ Не удалось сохранить кэш Excel файла: {str(e)}")
+
+
+def _parse_columns(excel_file_path: str, sheet_name: str, columns: set) -> tuple:
+    """
+    Читает столбцы листа через pandas/openpyxl (read_only) с отбором столбцов
+
+    Первый столбец листа читается всегда: без него при отсутствии нужных
+    столбцов потерялось бы количество строк.
+
+    Returns:
+        tuple: (DataFrame, список заголовков всех столбцов листа)
+    """
+    header = {}
+
+    def use_column(name):
+        position = header.setdefault(name, len(header))
+        return name in columns or position == 0
+
+    frame = pd.read_excel(excel_file_path, sheet_name=sheet_name, engine='openpyxl', usecols=use_column)
+    return frame, list(header)
+
+
+def load_manifest(excel_file_path: str, columns: Iterable[str], sheet_name: str = MANIFEST_SHEET_NAME,
+                  cache_directory: Optional[str] = None) -> pd.DataFrame:
+    """
+    Читает нужные столбцы листа Excel файла
+
+    Строки и значения - те же, что у pd.read_excel для всего листа.
+    Запись кэша действительна, пока у файла те же размер и время изменения;
+    если они изменились, а содержимое (хэш) нет, запись используется и
+    обновляется. Столбцы, которых еще нет в записи, дочитываются вместе с
+    уже сохраненными.
+
+    Args:
+        excel_file_path: Путь к Excel файлу
+        columns: Нужные столбцы; отсутствующих на листе столбцов в результате нет
+        sheet_name: Имя листа
+        cache_directory: Директория кэша (по умолчанию - в директории данных приложения)
+
+    Returns:
+        DataFrame: Запрошенные столбцы, которые есть на листе, в порядке листа
+
+    Raises:
+        OSError: Если файл не удалось прочитать
+        ValueError: Если в файле нет листа sheet_name
+    """
+    requested = set(columns)
+    columns = set(requested)
+    if cache_directory is None:
+        cache_directory = str(get_manifest_cache_directory())
+    cache_path = _cache_path(cache_directory, excel_file_path, sheet_name)
+    stat = os.stat(excel_file_path)
+
+    entry = _read_cache(cache_path)
+    digest = None
+    if entry is not None and (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+        # Файл могли скопировать или пересохранить без изменений - сверяем содержимое
+        digest = _file_digest(excel_file_path)
+        if digest == entry['digest']:
+            entry['size'], entry['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+            _write_cache(cache_path, entry)
+        else:
+            entry = None
+
+    if entry is not None:
+        missing = {column for column in columns if column in entry['header']} - set(entry['frame'].columns)
+        if not missing:
+            debug_logger.debug(f"💾 Столбцы Excel файла взяты из кэша: {os.path.basename(excel_file_path)}")
+            frame = entry['frame']
+            return frame[[column for column in frame.columns if column in requested]]
+        # Дочитываем недостающие столбцы вместе с сохраненными - запись остается одной таблицей
+        columns |= set(entry['frame'].columns)
+
+    debug_logger.info(f"📖 Читаем Excel файл: {os.path.basename(excel_file_path)}, лист '{sheet_name}', "
+                      f"столбцов: {len(columns)}")
+    frame, header = _parse_columns(excel_file_path, sheet_name, columns)
+    if digest is None:
+        digest = _file_digest(excel_file_path)
+    _write_cache(cache_path, {
+        'version': MANIFEST_CACHE_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'digest': digest,
+        'header': header,
+        'frame': frame,
+    })
+    return frame[[column for column in frame.columns if column in requested]]
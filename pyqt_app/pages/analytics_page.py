@@ -17,7 +17,8 @@ from ..logger_config import get_logger
 debug_logger = get_logger("analytics_page")
 
 # Импорт сессионного менеджера данных
-from ..session_data_manager import session_manager
+from ..session_data_manager import session_manager, result_file_type
+from ..manifest_loader import load_manifest
 
 from .base_page import BasePage
 
@@ -514,8 +515,8 @@ class AnalyticsPage(BasePage):
         error_count = comparison_result.get('error_count', 0)
         results_data = comparison_result.get('results_data', [])
           # Подсчитываем статистику
-        audio_errors = len([r for r in results_data if r.get('Тип файла') == 'Трек'])
-        cover_errors = len([r for r in results_data if r.get('Тип файла') == 'Обложка'])
+        audio_errors = len([r for r in results_data if result_file_type(r) == 'Трек'])
+        cover_errors = len([r for r in results_data if result_file_type(r) == 'Обложка'])
         
         # Получаем реальную статистику из Excel файла
         excel_stats = self.get_excel_statistics()
@@ -604,11 +605,13 @@ class AnalyticsPage(BasePage):
                     excel_path = paths_data.get('excel_file_path', '')
                     
                 if excel_path and os.path.exists(excel_path):
-                    # Читаем Excel файл
-                    df = pd.read_excel(excel_path)
+                    # Читаем только нужные столбцы листа релизов - после проверки файлов они уже в кэше
+                    df = load_manifest(excel_path, ['track (titel)', 'cover (titel)', 'release_name',
+                                                    'Треки', 'Количество треков'])
                     
                     # Подсчитываем статистику
-                    total_releases = len(df) if not df.empty else 0
+                    # Строки считаются по индексу: без запрошенных столбцов таблица пуста (df.empty), но строки есть
+                    total_releases = len(df)
                     # Подсчитываем треки (предполагаем, что каждый релиз может иметь несколько треков)
                     # Если есть колонка с количеством треков - используем её, иначе считаем по 1 треку на релиз
                     if 'Треки' in df.columns:
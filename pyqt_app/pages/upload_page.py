@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import threading
+
 from PyQt6.QtWidgets import (
     QLabel, QPushButton, QVBoxLayout, QHBoxLayout, 
-    QWidget, QFrame, QFileDialog, QScrollArea, QListWidget, QListWidgetItem
+    QWidget, QFrame, QFileDialog, QScrollArea, QListWidget, QListWidgetItem, QApplication
 )
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon, QPixmap, QColor, QPainter, QPen
@@ -26,6 +28,9 @@ except ImportError:
 # Импорт сессионного менеджера данных
 from ..session_data_manager import session_manager
 
+# Общий обход директории с проверкой файлов
+from ..directory_scanner import list_directory_files
+
 # Импорты для асинхронной загрузки
 from ..workers import UploadWorker, UpdateStatusWorker
 from ..dialogs import UploadProgressDialog, UpdateStatusProgressDialog
@@ -61,6 +66,11 @@ class UploadPage(BasePage):
         super().__init__("", parent)
         self.excel_file_path = None
         self.directory_path = None
+        # Режим наблюдения за директорией после проверки файлов
+        self.live_comparison = None
+        self.directory_watcher = None
+        # Событие отмены текущей проверки файлов (None - проверка не идет)
+        self.comparison_cancel_token = None
         self.setup_ui()
         self.load_saved_paths()
         self.check_interrupted_upload()
@@ -386,6 +396,7 @@ class UploadPage(BasePage):
         """)
         check_files_button.setCursor(Qt.CursorShape.PointingHandCursor)
         check_files_button.clicked.connect(self.check_files)
+        self.check_files_button = check_files_button
         
         # Контейнер для кнопки с выравниванием по левому краю
         check_files_button_container = QWidget()
@@ -641,6 +652,9 @@ class UploadPage(BasePage):
         )
         
         if file_name:
+            # Результаты наблюдения относятся к прежнему Excel файлу
+            self.stop_live_check()
+            
             # Сохраняем путь к файлу
             self.excel_file_path = file_name
             
@@ -660,6 +674,9 @@ class UploadPage(BasePage):
         )
         
         if directory:
+            # Результаты наблюдения относятся к прежней директории
+            self.stop_live_check()
+            
             # Показываем статус загрузки
             self.show_status('loading', "Сканирование директории, пожалуйста подождите...")
               # Сохраняем путь к директории
@@ -672,12 +689,11 @@ class UploadPage(BasePage):
             self.save_paths()
             
             # Получаем список всех файлов в директории
-            import os
             files = []
             
             try:
                 # Получаем все файлы в директории
-                files = [file for file in os.listdir(directory) if os.path.isfile(os.path.join(directory, file))]
+                files = list_directory_files(directory)
             except Exception as e:
                 debug_logger.error(f"❌ Ошибка при чтении директории: {e}")
                 files = []
@@ -708,6 +724,22 @@ class UploadPage(BasePage):
                     f"В выбранной директории не найдены файлы.\nПожалуйста, выберите другую директорию."
                 )
 
+    def on_comparison_progress(self, event):
+        """
+        Показывает ход проверки файлов (событие 'progress' из iter_compare)
+        
+        Args:
+            event (dict): 'done', 'total', 'errors', 'eta'
+        """
+        message = f"Проверка файлов: {event['done']} из {event['total']}"
+        if event['errors']:
+            message += f", с различиями: {event['errors']}"
+        if event.get('eta') is not None and event['done'] < event['total']:
+            message += f", осталось ~{int(event['eta']) + 1} с"
+        self.show_status('loading', message)
+        # Проверка идет в основном потоке - даем интерфейсу перерисоваться
+        QApplication.processEvents()
+
     def show_status(self, status_type, message):
         """
         Отображает статус операции
@@ -879,6 +911,13 @@ class UploadPage(BasePage):
 
     def check_files(self):
         """Проверка файлов в выбранной директории с использованием интегрированных скриптов"""
+        # Повторное нажатие во время проверки останавливает ее
+        if self.comparison_cancel_token is not None:
+            debug_logger.warning("🛑 Запрос на остановку проверки файлов")
+            self.comparison_cancel_token.set()
+            self.show_status('loading', "Останавливаем проверку...")
+            return
+        
         debug_logger.info("🔍 Началась проверка файлов")
         debug_logger.debug(f"Excel файл: {self.excel_file_path}")
         debug_logger.debug(f"Директория: {self.directory_path}")
@@ -916,7 +955,13 @@ class UploadPage(BasePage):
             script_manager = ScriptManager()
             
             debug_logger.info("🚀 Запускаем полный workflow проверки файлов")
-            result = script_manager.run_complete_workflow()
+            self.comparison_cancel_token = threading.Event()
+            self.check_files_button.setText("ОСТАНОВИТЬ ПРОВЕРКУ")
+            try:
+                result = script_manager.run_complete_workflow(self.on_comparison_progress, self.comparison_cancel_token)
+            finally:
+                self.comparison_cancel_token = None
+                self.check_files_button.setText("ПРОВЕРИТЬ ФАЙЛЫ")
             debug_logger.success(f"📊 Workflow завершен: {result.get('success', False)}")
             
             if result['success']:
@@ -997,6 +1042,15 @@ class UploadPage(BasePage):
                             excel_file_path=self.excel_file_path,
                             directory_path=self.directory_path
                         )
+                    
+                    # Дальше статус обновляется по изменениям в директории без полной проверки
+                    self.start_live_check()
+                
+                elif result.get('stage') == 'partial':
+                    debug_logger.warning("🛑 Проверка остановлена до завершения")
+                    # Частичная проверка не подтверждает файлы - кнопка загрузки остается неактивной
+                    self.disable_upload_button()
+                    self.show_status('warning', result['message'])
                         
                 else:
                     debug_logger.info("ℹ️ Workflow завершен без обработки ошибок")
@@ -1054,13 +1108,65 @@ class UploadPage(BasePage):
         
         debug_logger.info("🏁 Завершение метода check_files")
     
+    def start_live_check(self):
+        """Запускает наблюдение за директорией с инкрементальным обновлением результатов проверки"""
+        self.stop_live_check()
+        
+        from pyqt_app.script_manager import ScriptManager
+        from ..directory_watcher import DirectoryWatcher
+        
+        self.live_comparison = ScriptManager().create_live_comparison()
+        if self.live_comparison is None:
+            debug_logger.warning("⚠️ Режим наблюдения не запущен")
+            return
+        
+        self.directory_watcher = DirectoryWatcher(
+            self.live_comparison.directory_path,
+            self.live_comparison.scan_depth,
+            self.live_comparison.ignore_patterns,
+            parent=self
+        )
+        self.directory_watcher.files_changed.connect(self.on_directory_files_changed)
+        self.directory_watcher.start(self.live_comparison.directory_files)
+    
+    def stop_live_check(self):
+        """Останавливает наблюдение за директорией"""
+        if self.directory_watcher is not None:
+            self.directory_watcher.stop()
+            self.directory_watcher.deleteLater()
+        self.directory_watcher = None
+        self.live_comparison = None
+    
+    def on_directory_files_changed(self, added, removed):
+        """Обновляет статус проверки после изменений в директории"""
+        if self.live_comparison is None:
+            return
+        
+        try:
+            summary = self.live_comparison.apply_changes(added, removed)
+        except Exception as e:
+            debug_logger.error(f"❌ Ошибка при обновлении результатов проверки: {e}")
+            self.stop_live_check()
+            return
+        
+        for change in summary['changed']:
+            debug_logger.info(f"🔄 '{change['Название в Excel']}' → '{change['Найден в папке']}' ({change['Процент сходства']}%)")
+        
+        self.update_files_display()
+        error_count = summary['error_count']
+        if error_count == 0:
+            self.enable_upload_button()
+            self.show_status('success', summary['message'])
+        else:
+            self.disable_upload_button()
+            self.show_status('warning', f"{summary['message']} (обновлено по изменениям в папке)")
+    
     def update_files_display(self):
         """Обновляет отображение файлов в интерфейсе"""
         if self.directory_path:
-            import os
             try:
                 # Получаем все файлы в директории
-                files = [file for file in os.listdir(self.directory_path) if os.path.isfile(os.path.join(self.directory_path, file))]
+                files = list_directory_files(self.directory_path)
                 
                 # Обновляем счетчик файлов
                 self.files_count_label.setText(f"Всего файлов: {len(files)}")
@@ -1197,14 +1303,12 @@ class UploadPage(BasePage):
     
     def load_directory_files(self, directory):
         """Загрузка файлов из указанной директории"""
-        import os
-        
         try:
             # Очищаем текущий список
             self.files_list.clear()
             
             # Получаем список всех файлов в директории
-            files = [file for file in os.listdir(directory) if os.path.isfile(os.path.join(directory, file))]
+            files = list_directory_files(directory)
             
             # Заполняем список файлов
             for file in files:
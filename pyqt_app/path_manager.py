@@ -173,6 +173,9 @@ CONFIG_JSON_FILE = "config.json"
 TEMPLATES_JSON_FILE = "templates.json"
 SESSION_ANALYTICS_FILE = "session_analytics.json"
 UPLOAD_STATE_FILE = "upload_state.json"
+MATCH_CACHE_FILE = "match_cache.json"
+CONTENT_HASH_CACHE_FILE = "content_hash_cache.json"
+MANIFEST_CACHE_DIR = "manifest_cache"
 LOG_FILE_NAME = "file_check_debug.log"
 
 
@@ -201,6 +204,21 @@ def get_upload_state_path() -> Path:
     return get_file_in_data_dir(UPLOAD_STATE_FILE)
 
 
+def get_match_cache_path() -> Path:
+    """Получает путь к файлу кэша совпадений проверки файлов"""
+    return get_file_in_data_dir(MATCH_CACHE_FILE)
+
+
+def get_content_hash_cache_path() -> Path:
+    """Получает путь к файлу кэша хэшей содержимого файлов"""
+    return get_file_in_data_dir(CONTENT_HASH_CACHE_FILE)
+
+
+def get_manifest_cache_directory() -> Path:
+    """Получает путь к директории кэша прочитанных столбцов Excel файлов"""
+    return get_file_in_data_dir(MANIFEST_CACHE_DIR)
+
+
 def get_log_file_path() -> Path:
     """Получает путь к основному файлу логов"""
     return get_logs_directory() / LOG_FILE_NAME
@@ -5,6 +5,7 @@ import os
 import sys
 import importlib.util
 import json
+import threading
 from typing import Dict, Any, Callable, List, Optional
 from pathlib import Path
 
@@ -247,10 +248,17 @@ class ScriptManager:
                 debug_logger.error(f"❌ Ошибка при загрузке paths.json: {str(e)}")
         return {}
     
-    def run_file_comparison(self) -> Dict[str, Any]:
+    def run_file_comparison(self, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                            cancel_token: Optional[threading.Event] = None) -> Dict[str, Any]:
         """
         Запускает сравнение файлов с использованием сохраненных путей
         
+        Args:
+            progress_callback: Функция, получающая события хода проверки ('progress')
+                из iter_compare; без нее вызывается compare_files_with_excel
+            cancel_token: Событие отмены - после его установки проверка останавливается
+                и возвращает частичный результат ('partial': True)
+        
         Returns:
             Результат сравнения файлов
         """
@@ -282,8 +290,17 @@ class ScriptManager:
         # Вызываем функцию сравнения
         try:
             debug_logger.info("🚀 Запускаем функцию сравнения файлов")
-            compare_function = getattr(module, 'compare_files_with_excel')
-            result = compare_function()
+            options = {'cancel_token': cancel_token} if cancel_token is not None else {}
+            if progress_callback is not None and hasattr(module, 'iter_compare'):
+                result = None
+                for event in module.iter_compare(**options):
+                    if event['event'] == 'progress':
+                        progress_callback(event)
+                    elif event['event'] == 'result':
+                        result = event['result']
+            else:
+                compare_function = getattr(module, 'compare_files_with_excel')
+                result = compare_function(**options)
             debug_logger.success(f"📊 Сравнение завершено: {result.get('success', False)}")
             return result
         except Exception as e:
@@ -295,6 +312,31 @@ class ScriptManager:
                 'message': f"Ошибка при выполнении сравнения файлов: {str(e)}"
             }
     
+    def create_live_comparison(self) -> Optional[Any]:
+        """
+        Создает проверку файлов в режиме наблюдения за директорией по сохраненным путям
+        
+        Returns:
+            Экземпляр LiveComparison из compare_files.py или None в случае ошибки
+        """
+        module = self.load_script('compare_files.py')
+        if not module or not hasattr(module, 'LiveComparison'):
+            debug_logger.error("❌ LiveComparison не найден в модуле compare_files.py")
+            return None
+        
+        paths = self.load_paths_from_json()
+        excel_file_path = paths.get('excel_file_path')
+        directory_path = paths.get('directory_path')
+        if not excel_file_path or not directory_path:
+            debug_logger.warning("⚠️ Пути для режима наблюдения не сохранены")
+            return None
+        
+        try:
+            return module.LiveComparison(excel_file_path, directory_path)
+        except Exception as e:
+            debug_logger.error(f"❌ Не удалось запустить режим наблюдения: {str(e)}")
+            return None
+    
     def run_excel_processing(self, error_file_path: str = None) -> Dict[str, Any]:
         """
         Запускает обработку Excel файла с ошибками
@@ -330,10 +372,15 @@ class ScriptManager:
                 'message': f"Ошибка при обработке Excel файла: {str(e)}"
             }
     
-    def run_complete_workflow(self) -> Dict[str, Any]:
+    def run_complete_workflow(self, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                              cancel_token: Optional[threading.Event] = None) -> Dict[str, Any]:
         """
         Выполняет полный workflow: сравнение файлов → обработка ошибок
         
+        Args:
+            progress_callback: Функция для событий хода проверки (см. run_file_comparison)
+            cancel_token: Событие отмены проверки (см. run_file_comparison)
+        
         Returns:
             Результат выполнения полного workflow
         """
@@ -341,7 +388,7 @@ class ScriptManager:
         
         # Этап 1: Сравнение файлов
         debug_logger.info("📋 Этап 1: Сравнение файлов")
-        comparison_result = self.run_file_comparison()
+        comparison_result = self.run_file_comparison(progress_callback, cancel_token)
         debug_logger.debug(f"📊 Результат сравнения: {comparison_result.get('success', False)}")
         
         if not comparison_result['success']:
@@ -352,6 +399,16 @@ class ScriptManager:
                 'stage': 'comparison'
             }
         
+        # Остановленная проверка не подтверждает файлы - загрузку не разрешаем
+        if comparison_result.get('partial'):
+            debug_logger.warning(f"🛑 Проверка остановлена: {comparison_result['message']}")
+            return {
+                'success': True,
+                'message': comparison_result['message'],
+                'stage': 'partial',
+                'comparison_result': comparison_result
+            }
+        
         # Проверяем количество ошибок
         error_count = comparison_result.get('error_count', 0)
         debug_logger.info(f"📈 Найдено ошибок: {error_count}")
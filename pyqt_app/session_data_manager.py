@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import json
+import multiprocessing
 import os
 from datetime import datetime
 from typing import Dict, Optional, Any
@@ -20,6 +21,29 @@ except ImportError:
     MACOS_BUILD_AVAILABLE = False
 
 
+def result_file_type(record) -> Optional[str]:
+    """
+    Тип файла ('Трек' или 'Обложка') записи из comparison_result['results_data']
+    
+    Записи приходят как MatchResult (из compare_files), как списки (после
+    сохранения в сессию - MatchResult.to_list()) или как словари со столбцами
+    отчета (сессии, сохраненные прежними версиями).
+    """
+    if isinstance(record, dict):
+        return record.get('Тип файла')
+    if isinstance(record, (list, tuple)):
+        return record[0] if record else None
+    return getattr(record, 'file_type', None)
+
+
+def _json_default(value):
+    """Сериализует записи результатов (MatchResult) компактными списками"""
+    to_list = getattr(value, 'to_list', None)
+    if to_list is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_list()
+
+
 class SessionDataManager:
     """
     Менеджер сессионных данных для аналитики
@@ -52,8 +76,11 @@ class SessionDataManager:
         debug_logger.debug(f"📄 Файл сессии: {self.session_file}")
         debug_logger.debug(f"📄 Файл состояния загрузки: {self.upload_state_file}")
         
-        # Очищаем все старые сессионные данные при запуске (создает пустые файлы)
-        self.clear_all_session_data()
+        # Очищаем все старые сессионные данные при запуске (создает пустые файлы).
+        # Дочерний процесс (воркер сопоставления, запущенный через spawn) заново
+        # импортирует модули и не должен стирать сессию работающего приложения
+        if multiprocessing.current_process().name == 'MainProcess':
+            self.clear_all_session_data()
     
     def save_upload_state(self, last_processed_index: int, total_releases: int, 
                          excel_path: str = "", directory_path: str = "") -> bool:
@@ -193,7 +220,7 @@ class SessionDataManager:
             
             # Сохраняем в файл
             with open(self.session_file, "w", encoding="utf-8") as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2)
+                json.dump(session_data, f, ensure_ascii=False, indent=2, default=_json_default)
             
             debug_logger.success("✅ Сессионные данные успешно сохранены")
             return True
@@ -441,8 +468,8 @@ class SessionDataManager:
             results_data = comparison_result.get('results_data', [])
             
             # Подсчитываем статистику по типам файлов
-            audio_errors = len([r for r in results_data if r.get('Тип файла') == 'Трек'])
-            cover_errors = len([r for r in results_data if r.get('Тип файла') == 'Обложка'])
+            audio_errors = len([r for r in results_data if result_file_type(r) == 'Трек'])
+            cover_errors = len([r for r in results_data if result_file_type(r) == 'Обложка'])
             
             summary = {
                 "total_errors": error_count,
@@ -7,10 +7,17 @@
 """
 
 import sys
-from pyqt_app.main import MainWindow
-from PyQt6.QtWidgets import QApplication
+import multiprocessing
 
 if __name__ == "__main__":
+    # Нужно для процессов-воркеров сравнения файлов в собранном приложении (PyInstaller)
+    multiprocessing.freeze_support()
+    
+    # Приложение импортируется только здесь: при запуске через spawn (Windows/macOS)
+    # воркеры заново импортируют этот файл и не должны загружать pyqt_app
+    from pyqt_app.main import MainWindow
+    from PyQt6.QtWidgets import QApplication
+    
     app = QApplication(sys.argv)
     
     # Установка стиля приложения
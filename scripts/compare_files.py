@@ -1,12 +1,13 @@
 import pandas as pd
 import os
-from difflib import SequenceMatcher
+import shutil
+import time
 from pathlib import Path
 from datetime import datetime
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
-import unicodedata
-import re
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import PatternFill, Font
+from openpyxl.utils import get_column_letter
+import numpy as np
 
 # DEBUG: Добавляем логирование для отладки процесса сравнения файлов
 # Импортируем логгер и path_manager из pyqt_app
@@ -14,106 +15,42 @@ import sys
 script_dir = Path(__file__).parent.parent
 sys.path.append(str(script_dir))
 from pyqt_app.logger_config import get_logger
-from pyqt_app.path_manager import get_data_file_path, get_config_file_path, get_results_directory_path
+from pyqt_app.path_manager import (
+    get_data_file_path, get_config_file_path, get_results_directory_path, get_match_cache_path,
+    get_content_hash_cache_path
+)
+from pyqt_app.directory_scanner import DEFAULT_SCAN_DEPTH, DEFAULT_IGNORE_PATTERNS, scan_directory
+from pyqt_app.manifest_loader import MANIFEST_SHEET_NAME, load_manifest
 debug_logger = get_logger("compare_files")
 
-def normalize_filename(filename):
-    """Нормализует имя файла для корректного сравнения"""
-    if not filename or pd.isna(filename) or str(filename).strip() == '':
-        return ''
-    
-    # Преобразуем в строку и убираем пробелы по краям
-    filename = str(filename).strip()
-    
-    # Нормализация Unicode
-    filename = unicodedata.normalize('NFKC', filename)
-    
-    # Обработка пробелов вокруг специальных символов
-    # Убираем пробелы перед скобками, точками и другими спецсимволами
-    filename = re.sub(r'\s*([\(\)\[\]\{\}\.,\-_])\s*', r'\1', filename)
-    
-    # Заменяем множественные пробелы на один
-    filename = re.sub(r'\s+', ' ', filename)
-    
-    # Приводим к нижнему регистру
-    filename = filename.lower()
-    
-    # Отдельно обрабатываем расширение файла
-    name, ext = os.path.splitext(filename)
-    if ext:
-        # Убираем точку из расширения для сравнения
-        ext = ext[1:] if ext.startswith('.') else ext
-        # Убираем пробелы вокруг точки расширения
-        return f"{name.strip()}.{ext.strip()}"
-    
-    return filename.strip()
+# Движок сопоставления лежит рядом в scripts/ и не зависит от pyqt_app
+sys.path.append(str(Path(__file__).parent))
+from match_engine import (
+    SIMILARITY_FLOOR,
+    DEFAULT_PREFILTER,
+    ASSIGNMENT_GREEDY,
+    ASSIGNMENT_OPTIMAL,
+    DirectoryIndex,
+    normalize_filename,
+    normalize_cache_info,
+    calculate_similarity,
+    find_closest_match,
+    match_filenames,
+    iter_match_filenames,
+    assign_filenames,
+    IncrementalMatcher,
+)
+from match_cache import cached_match_filenames, iter_cached_match_filenames
+from similarity_backends import DEFAULT_SCORER, get_scorer
+from content_hash import ContentHashIndex
+from media_headers import COVER_MIN_SIZE, check_media_files
+from report_writer import StreamingReportWriter
 
-def calculate_similarity(a, b):
-    """Вычисляет процент сходства между двумя строками"""
-    if not a or not b:
-        return 0
-    
-    # Нормализуем строки перед сравнением
-    a = normalize_filename(a)
-    b = normalize_filename(b)
-    
-    # Разделяем имя и расширение
-    a_name, a_ext = os.path.splitext(a)
-    b_name, b_ext = os.path.splitext(b)
-    
-    # Если расширения разные, уменьшаем сходство
-    if a_ext.lower() != b_ext.lower():
-        return 0
-    
-    # Сравниваем только имена файлов без расширений
-    similarity = SequenceMatcher(None, a_name, b_name).ratio() * 100
-    
-    return similarity
+# Столбцы Excel с названиями файлов треков и обложек
+REQUIRED_COLUMNS = ['track (titel)', 'cover (titel)']
 
-def find_closest_match(filename, file_list):
-    """Находит самое похожее название файла и процент сходства"""
-    if not filename or pd.isna(filename) or str(filename).strip() == '':
-        return '', 0
-    
-    normalized_filename = normalize_filename(filename)
-    if not normalized_filename:
-        return '', 0
-    
-    # Выводим отладочную информацию
-    debug_logger.info(f"\n🔍 Искомый файл: '{filename}'")
-    debug_logger.info(f"🔧 Нормализованный файл: '{normalized_filename}'")
-    
-    # Разделяем имя и расширение искомого файла
-    filename_name, filename_ext = os.path.splitext(normalized_filename)
-    
-    max_similarity = 0
-    closest_match = None
-    closest_match_original = None
-    
-    for original_file in file_list:
-        normalized_file = normalize_filename(original_file)
-        # Проверяем расширение
-        _, file_ext = os.path.splitext(normalized_file)
-        
-        # Если расширения разные, пропускаем файл
-        if filename_ext.lower() != file_ext.lower():
-            continue
-            
-        similarity = calculate_similarity(normalized_filename, normalized_file)
-        if similarity > max_similarity:
-            max_similarity = similarity
-            closest_match = normalized_file
-            closest_match_original = original_file
-            
-            # Выводим информацию о найденном совпадении
-            debug_logger.debug(f"\n🎯 Найдено лучшее совпадение:")
-            debug_logger.debug(f"📝 Искомый файл     : '{filename}'")
-            debug_logger.debug(f"🔧 Нормализованный  : '{normalized_filename}'")
-            debug_logger.debug(f"📁 Найденный файл   : '{original_file}'")
-            debug_logger.debug(f"🔧 Нормализованный  : '{normalized_file}'")
-            debug_logger.debug(f"📊 Процент сходства : {similarity}%")
-    
-    return closest_match_original, max_similarity
+# Столбцы, которые читает проверка (остальные столбцы листа не загружаются)
+MANIFEST_COLUMNS = REQUIRED_COLUMNS + ['release_name']
 
 def find_char_differences(str1, str2):
     """Находит различия между двумя строками"""
@@ -142,18 +79,233 @@ def find_char_differences(str1, str2):
     
     return '; '.join(char_differences) if char_differences else ''
 
-def compare_files_with_excel(excel_file_path=None, directory_path=None):
+# Как часто iter_compare сообщает о ходе сопоставления (секунды)
+PROGRESS_EVENT_INTERVAL = 0.5
+
+# Сколько названий сопоставить, прежде чем оценивать оставшееся время
+PROGRESS_MIN_SAMPLES = 10
+
+# Тип файла в отчете для столбцов с названиями
+COLUMN_FILE_TYPES = {'track (titel)': 'Трек', 'cover (titel)': 'Обложка'}
+
+# Релиз для строк без заполненного release_name
+NO_RELEASE_NAME = 'Без указания релиза'
+
+# Столбцы листов 'Все файлы' и 'Только ошибки'
+REPORT_COLUMNS = ['Тип файла', 'Название в Excel', 'Найден в папке', 'Ближайшее совпадение', 'Процент сходства',
+                  'Различия', 'Статус']
+MEDIA_CHECK_COLUMN = 'Проверка файла'
+
+# Сообщения листа 'Только ошибки', когда ошибок нет
+NO_ERRORS_MESSAGES = ('Все файлы из Excel найдены в директории', 'Среди проверенных названий ошибок нет')
+
+# Именованные стили отчета: регистрируются в книге один раз, ячейки ссылаются на них по имени
+def _solid_fill(color):
+    return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+REPORT_STYLES = {
+    'report_header': {'font': Font(color='FFFFFF', bold=True), 'fill': _solid_fill('366092')},
+    'summary_title': {'font': Font(color='FFFFFF', bold=True, size=14), 'fill': _solid_fill('366092')},
+    'summary_section': {'font': Font(bold=True, size=12), 'fill': _solid_fill('D9E2F3')},
+    'summary_table_header': {'font': Font(bold=True), 'fill': _solid_fill('E2EFDA')},
+    'manager_token': {'font': Font(bold=True, size=11), 'fill': _solid_fill('FFE4B5')},
+    'legend_title': {'font': Font(bold=True, size=12)},
+    'no_errors': {'font': Font(bold=True, size=12, color='008000'), 'fill': _solid_fill('E8F5E8')},
+}
+
+# Градация сходства на листе 'Все файлы' от лучшей к худшей:
+# (стиль легенды, цвет, условие для ячейки с процентом сходства, текст легенды)
+SIMILARITY_LEVELS = [
+    ('similarity_perfect', '00FF00', '{0}=100', '100% - Идеальное совпадение'),
+    ('similarity_high', '90EE90', 'AND({0}>=90,{0}<100)', '90-99% - Очень хорошее совпадение'),
+    ('similarity_good', 'FFA500', 'AND({0}>=80,{0}<90)', '80-89% - Хорошее совпадение'),
+    ('similarity_medium', 'FFD700', 'AND({0}>=50,{0}<80)', '50-79% - Среднее совпадение'),
+    ('similarity_low', 'FFB6C1', 'AND({0}>0,{0}<50)', '1-49% - Плохое совпадение'),
+    ('similarity_none', 'FF0000', '{0}<=0', '0% - Файл не найден'),
+]
+for _name, _color, _, _ in SIMILARITY_LEVELS:
+    REPORT_STYLES[_name] = {'fill': _solid_fill(_color), 'font': Font(bold=True)}
+
+# Выделение строк листа 'Только ошибки': (цвет, условие для ячейки с процентом сходства)
+ERROR_LEVELS = [
+    ('FFFF0000', '{0}<50'),
+    ('FFFF00', 'AND({0}>=50,{0}<80)'),
+]
+
+# Максимальная ширина столбца при автоподборе
+MAX_COLUMN_WIDTH = 50
+
+
+class MatchResult:
+    """
+    Результат сопоставления одного названия из Excel
+    
+    Столбцы отчета с русскими названиями строятся из этих записей только
+    при записи отчета (_report_frame).
+    """
+
+    __slots__ = ('file_type', 'name', 'closest', 'similarity', 'differences', 'media_check')
+
+    def __init__(self, file_type, name, closest, similarity, differences, media_check=None):
+        self.file_type = file_type
+        self.name = name
+        # Путь найденного файла относительно директории; пустая строка - файл не найден
+        self.closest = closest
+        self.similarity = similarity
+        self.differences = differences
+        # Текст проверки заголовка файла (None - проверка не включена)
+        self.media_check = media_check
+
+    def to_list(self):
+        """Компактное представление для JSON: значения в порядке __slots__"""
+        return [getattr(self, field) for field in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values):
+        """Восстанавливает запись из to_list()"""
+        return cls(*values)
+
+    def __repr__(self):
+        return f"MatchResult({self.name!r}, {self.closest!r}, {self.similarity:.2f})"
+
+
+def _report_frame(results, with_media_check=False):
+    """Строки листа отчета из записей MatchResult (столбцы REPORT_COLUMNS)"""
+    similarity = np.array([result.similarity for result in results], dtype=float)
+    closest = pd.Series([result.closest for result in results], dtype=object)
+    frame = pd.DataFrame({
+        'Тип файла': [result.file_type for result in results],
+        'Название в Excel': pd.Series([result.name for result in results], dtype=object),
+        'Найден в папке': closest.where(closest.ne(''), 'Не найден'),
+        'Ближайшее совпадение': closest,
+        'Процент сходства': np.where(similarity > 0, np.round(similarity, 2), 0),
+        'Различия': [result.differences for result in results],
+        'Статус': np.select([similarity == 100, similarity >= 50], ['Точное соответствие', 'Частичное соответствие'],
+                            'Не найден'),
+    }, columns=REPORT_COLUMNS)
+    if with_media_check:
+        frame[MEDIA_CHECK_COLUMN] = [result.media_check for result in results]
+    return frame
+
+def _filled_mask(column):
+    """Маска заполненных ячеек столбца (не пустые и не из одних пробелов)"""
+    return column.notna() & column.astype(str).str.strip().ne('')
+
+def _manifest_cells_frame(df, columns):
+    """
+    Заполненные ячейки с названиями файлов в виде таблицы (по столбцам)
+    
+    Returns:
+        DataFrame: Столбцы 'position' (позиция строки в df), 'column_order'
+            (номер столбца в columns), 'column' и 'name' - по одной строке на ячейку
+    """
+    frames = []
+    for column_order, column in enumerate(columns):
+        values = df[column]
+        positions = np.flatnonzero(_filled_mask(values).to_numpy())
+        frames.append(pd.DataFrame({
+            'position': positions,
+            'column_order': column_order,
+            'column': column,
+            'name': values.to_numpy()[positions],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def _collect_manifest_cells(df, columns):
+    """
+    Собирает заполненные ячейки с названиями файлов
+    
+    Returns:
+        tuple: (список ключей (индекс строки, столбец), список названий)
+    """
+    cells = _manifest_cells_frame(df, columns)
+    cell_keys = list(zip(df.index[cells['position'].to_numpy()], cells['column']))
+    return cell_keys, cells['name'].tolist()
+
+def _directory_snapshot(scanned_files):
+    """Снимок директории для кэша совпадений: относительный путь -> время изменения"""
+    return {scanned.relative_path: scanned.mtime_ns for scanned in scanned_files}
+
+def _result_event(result):
+    """Последнее событие iter_compare - итоговый результат сравнения"""
+    return {'event': 'result', 'result': result}
+
+def _stop_reason(cancel_token, time_budget, started_at):
+    """Причина досрочной остановки проверки или None, если проверку можно продолжать"""
+    if cancel_token is not None and cancel_token.is_set():
+        return "Проверка отменена"
+    if time_budget is not None and time.monotonic() - started_at >= time_budget:
+        return f"Превышен лимит времени проверки ({time_budget:g} с)"
+    return None
+
+def compare_files_with_excel(excel_file_path=None, directory_path=None, **options):
     """
     Сравнивает файлы из Excel с реальными файлами в директории
     
-    Args:
-        excel_file_path: Путь к Excel файлу (если не указан, берется из paths.json)
-        directory_path: Путь к директории с файлами (если не указан, берется из paths.json)
+    Потребляет события iter_compare и возвращает итоговый результат.
+    Параметры - как у iter_compare.
     
     Returns:
         dict: Результат сравнения с ключами 'success', 'results_file', 'error_count', 'message'
+            и 'partial' (True, если проверка остановлена по cancel_token или time_budget)
+    """
+    result = None
+    for event in iter_compare(excel_file_path, directory_path, **options):
+        if event['event'] == 'result':
+            result = event['result']
+    return result
+
+def iter_compare(excel_file_path=None, directory_path=None, similarity_floor=SIMILARITY_FLOOR, workers=1,
+                 prefilter=DEFAULT_PREFILTER, assignment=ASSIGNMENT_GREEDY, use_cache=True,
+                 scan_depth=DEFAULT_SCAN_DEPTH, ignore_patterns=DEFAULT_IGNORE_PATTERNS,
+                 content_hashing=False, validate_media=False, min_cover_size=COVER_MIN_SIZE,
+                 scorer=DEFAULT_SCORER, cancel_token=None, time_budget=None):
+    """
+    Сравнивает файлы из Excel с реальными файлами в директории, сообщая о ходе проверки
+    
+    Генератор событий (словарей с ключом 'event'):
+    - 'row': результат сопоставления одной ячейки - 'index' (номер названия),
+      'row' (позиция строки Excel), 'file_type', 'name', 'closest', 'similarity';
+    - 'progress': 'done', 'total', 'errors' (названий со сходством меньше 100%),
+      'elapsed' и 'eta' в секундах (eta - None, пока оценивать рано);
+    - 'result': последнее событие, 'result' - словарь как у compare_files_with_excel.
+    Генератор можно закрыть раньше (например, если ошибок слишком много) -
+    тогда отчет не создается. Остановка по cancel_token или time_budget,
+    наоборот, создает отчет по уже сопоставленным названиям.
+    
+    Args:
+        excel_file_path: Путь к Excel файлу (если не указан, берется из paths.json)
+        directory_path: Путь к директории с файлами (если не указан, берется из paths.json)
+        similarity_floor: Порог сходства, выше которого нечеткий поиск дает тот же
+            результат, что и полный перебор (0 - всегда полный результат)
+        workers: Количество процессов для сопоставления названий (1 - без параллелизма)
+        prefilter: Отбор кандидатов для нечеткого поиска: 'trigram' (по умолчанию),
+            'numpy' (векторизованный, для директорий с десятками тысяч файлов) или None
+        assignment: 'greedy' - каждая строка берет лучший файл; 'optimal' - каждый файл
+            назначается не более чем одной строке (оптимальное назначение)
+        use_cache: Использовать кэш совпадений прошлых проверок (только для режима 'greedy')
+        scan_depth: Глубина обхода подпапок директории (0 - только сама директория, None - все уровни);
+            файлы из подпапок сопоставляются по имени и показываются в отчете с относительным путем
+        ignore_patterns: Шаблоны имен служебных файлов и папок, которые не учитываются
+        content_hashing: Хэшировать содержимое файлов (BLAKE2), чтобы найти дубликаты и
+            переименованные файлы; хэши кэшируются, повторно читаются только измененные файлы
+        validate_media: Проверить заголовки найденных файлов (WAV/FLAC/MP3, размеры обложек
+            JPEG/PNG) и добавить в отчет столбец 'Проверка файла'; файл с ошибкой считается ошибкой
+        min_cover_size: Минимальная сторона обложки в пикселях для validate_media
+        scorer: Алгоритм оценки сходства: 'difflib' (по умолчанию), 'levenshtein',
+            'jaro_winkler' или 'token_set' (см. similarity_backends)
+        cancel_token: threading.Event - после его установки (например, из другого потока или
+            из обработчика событий) сопоставление останавливается перед следующим названием
+        time_budget: Лимит времени проверки в секундах (None - без ограничения)
+    
+    В результате остановленной проверки 'partial' равен True, 'stop_reason' - причина
+    остановки; отчет и статистика охватывают только сопоставленные названия.
+    
+    Yields:
+        dict: События проверки
     """
     debug_logger.info("🔍 Начинаем сравнение файлов с Excel")
+    run_started_at = time.monotonic()
     debug_logger.debug(f"📄 Excel файл: {excel_file_path}")
     debug_logger.debug(f"📁 Директория: {directory_path}")
     
@@ -184,12 +336,13 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
                         debug_logger.debug(f"📁 Загружен путь директории: {directory_path}")
             except Exception as e:
                 debug_logger.error(f"❌ Ошибка при загрузке paths.json: {str(e)}")
-                return {
+                yield _result_event({
                     'success': False,
                     'message': f"Ошибка при загрузке paths.json: {str(e)}",
                     'results_file': None,
                     'error_count': 0
-                }
+                })
+                return
         else:
             debug_logger.warning("⚠️ Файл paths.json не найден")
     
@@ -197,43 +350,59 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
     debug_logger.info("🔍 Проверяем наличие путей")
     if not excel_file_path:
         debug_logger.error("❌ Не указан путь к Excel файлу")
-        return {
+        yield _result_event({
             'success': False,
             'message': "Не указан путь к Excel файлу",
             'results_file': None,
             'error_count': 0
-        }
+        })
+        return
     
     if not directory_path:
         debug_logger.error("❌ Не указан путь к директории с файлами")
-        return {
+        yield _result_event({
             'success': False,
             'message': "Не указан путь к директории с файлами",
             'results_file': None,
             'error_count': 0
-        }
+        })
+        return
     
     debug_logger.info("🔍 Проверяем существование файлов")
     if not os.path.exists(excel_file_path):
         debug_logger.error(f"❌ Excel файл не найден: {excel_file_path}")
-        return {
+        yield _result_event({
             'success': False,
             'message': f"Excel файл не найден: {excel_file_path}",
             'results_file': None,
             'error_count': 0
-        }
+        })
+        return
         
     if not os.path.exists(directory_path):
         debug_logger.error(f"❌ Директория не найдена: {directory_path}")
-        return {
+        yield _result_event({
             'success': False,
             'message': f"Директория не найдена: {directory_path}",
             'results_file': None,
             'error_count': 0
-        }    
+        })
+        return    
     
     debug_logger.success("✅ Все пути проверены и существуют")
     
+    try:
+        scorer = get_scorer(scorer).name
+    except ValueError as e:
+        debug_logger.error(f"❌ {str(e)}")
+        yield _result_event({
+            'success': False,
+            'message': str(e),
+            'results_file': None,
+            'error_count': 0
+        })
+        return
+    
     # Создаем директорию results, если её нет
     results_dir = get_results_directory_path()
     debug_logger.debug(f"📁 Директория результатов: {results_dir}")
@@ -241,38 +410,47 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
         os.makedirs(results_dir)
         debug_logger.info("📁 Создана директория для результатов")
 
+    # Счетчики кэша нормализации до проверки - в отчет попадает работа этой проверки
+    normalize_before = normalize_cache_info()
+    
     # Получаем список реальных файлов в директории
     debug_logger.info("📋 Получаем список файлов в директории")
-    actual_files = [f for f in os.listdir(directory_path)]
+    scanned_files = scan_directory(directory_path, scan_depth, ignore_patterns, with_stat=use_cache or content_hashing)
+    actual_files = [scanned.relative_path for scanned in scanned_files]
     debug_logger.info(f"📊 Найдено {len(actual_files)} файлов в директории")
     debug_logger.debug(f"📝 Список файлов: {actual_files[:10]}...")  # Показываем только первые 10
     
+    # Нормализуем имена файлов один раз на все сравнение
+    directory_index = DirectoryIndex(actual_files)
+    
     try:
         debug_logger.info("📖 Читаем Excel файл")
-        # Читаем только Лист1 из Excel файла
-        df = pd.read_excel(excel_file_path, sheet_name='Лист1', engine='openpyxl')
+        # Читаем только нужные столбцы Лист1 (повторное чтение того же файла - из кэша)
+        df = load_manifest(excel_file_path, MANIFEST_COLUMNS, MANIFEST_SHEET_NAME)
         debug_logger.success(f"✅ Excel файл прочитан, строк: {len(df)}")
     except Exception as e:        
         debug_logger.error(f"❌ Ошибка при чтении Excel файла: {str(e)}")
-        return {
+        yield _result_event({
             'success': False,
             'message': f"Ошибка при чтении Excel файла: {str(e)}",
             'results_file': None,
             'error_count': 0
-        }
+        })
+        return
     
     # Проверяем наличие необходимых столбцов
-    required_columns = ['track (titel)', 'cover (titel)']
+    required_columns = REQUIRED_COLUMNS
     if not all(col in df.columns for col in required_columns):
-        return {
+        yield _result_event({
             'success': False,
             'message': f"В Excel файле отсутствуют необходимые столбцы: {required_columns}",
             'results_file': None,
             'error_count': 0
-        }
+        })
+        return
     
     # Логируем информацию о колонках Excel файла
-    debug_logger.info(f"📋 Найденные колонки в Excel файле: {list(df.columns)}")
+    debug_logger.info(f"📋 Найденные колонки в Excel файле (из нужных): {list(df.columns)}")
     if 'release_name' in df.columns:
         debug_logger.info("✅ Колонка 'release_name' найдена в Excel файле")
         # Проверяем сколько строк имеют заполненную колонку release_name
@@ -285,161 +463,160 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
     else:
         debug_logger.warning("⚠️ Колонка 'release_name' НЕ найдена в Excel файле - все файлы будут отнесены к 'Без указания релиза'")
 
-    # Создаем списки для хранения результатов
-    all_results = []
-    errors_only = []
+    # Релиз каждой строки Excel (пустые значения - "Без указания релиза")
+    if 'release_name' in df.columns:
+        releases = df['release_name'].where(_filled_mask(df['release_name']), NO_RELEASE_NAME)
+    else:
+        releases = pd.Series(NO_RELEASE_NAME, index=df.index, dtype=object)
+
+    # Заполненные ячейки треков и обложек - дальше все считается по столбцам этой таблицы
+    cells = _manifest_cells_frame(df, required_columns)
+    cell_names = cells['name'].tolist()
+
+    # Сопоставляем все заполненные ячейки треков и обложек (при workers > 1 - в нескольких процессах)
+    debug_logger.info(f"🔎 Сопоставляем {len(cell_names)} названий из Excel (режим: {assignment}, сходство: {scorer})")
+    if assignment == ASSIGNMENT_OPTIMAL:
+        # Оптимальное назначение глобально - результаты появляются все сразу, а при отмене
+        # или исчерпании бюджета времени их нет совсем (None): проверка ниже отметит остановку
+        deadline = run_started_at + time_budget if time_budget is not None else None
+        assigned = assign_filenames(cell_names, directory_index, similarity_floor, workers, prefilter,
+                                    scorer=scorer, cancel_token=cancel_token, deadline=deadline)
+        match_results = iter(assigned if assigned is not None else ())
+    elif use_cache:
+        # Повторная проверка пересчитывает только названия, затронутые изменениями в директории
+        match_results = iter_cached_match_filenames(cell_names, directory_index, directory_path,
+                                                    _directory_snapshot(scanned_files),
+                                                    get_match_cache_path(), similarity_floor, workers, prefilter,
+                                                    scorer)
+    else:
+        match_results = iter_match_filenames(cell_names, directory_index, similarity_floor, workers, prefilter,
+                                             scorer)
+    
+    cell_results = []
+    match_errors = 0
+    started_at = time.monotonic()
+    last_progress_at = None
+    cell_positions = cells['position'].tolist()
+    cell_types = cells['column'].map(COLUMN_FILE_TYPES).tolist()
+    # Отмена и лимит времени проверяются между названиями
+    stop_reason = _stop_reason(cancel_token, time_budget, run_started_at)
+    for index, (closest, similarity_value) in enumerate(match_results if stop_reason is None else ()):
+        cell_results.append((closest, similarity_value))
+        if similarity_value < 100:
+            match_errors += 1
+        yield {'event': 'row', 'index': index, 'row': cell_positions[index], 'file_type': cell_types[index],
+               'name': cell_names[index], 'closest': closest, 'similarity': similarity_value}
+        
+        now = time.monotonic()
+        done = index + 1
+        if last_progress_at is None or now - last_progress_at >= PROGRESS_EVENT_INTERVAL or done == len(cell_names):
+            last_progress_at = now
+            elapsed = now - started_at
+            # Оценка оставшегося времени по средней скорости (после первых названий)
+            eta = elapsed / done * (len(cell_names) - done) if done >= PROGRESS_MIN_SAMPLES else None
+            yield {'event': 'progress', 'done': done, 'total': len(cell_names), 'errors': match_errors,
+                   'elapsed': elapsed, 'eta': eta}
+        
+        if done < len(cell_names):
+            stop_reason = _stop_reason(cancel_token, time_budget, run_started_at)
+            if stop_reason is not None:
+                break
+    
+    partial = stop_reason is not None
+    total_names = len(cell_names)
+    if partial:
+        # Останавливаем сопоставление (процессы и кэш) и оставляем только готовые названия
+        close_matching = getattr(match_results, 'close', None)
+        if close_matching is not None:
+            close_matching()
+        debug_logger.warning(f"🛑 {stop_reason}: сопоставлено {len(cell_results)} из {total_names} названий")
+        cells = cells.iloc[:len(cell_results)].copy()
+        cell_names = cell_names[:len(cell_results)]
+    
+    # Дубликаты и переименованные файлы по содержимому
+    # (после остановки пропускаются - оператору нужен отчет сразу)
+    content_flags = []
+    if content_hashing and not partial:
+        content_flags = _find_content_flags(directory_path, scanned_files, cell_names, cell_results)
+    
+    # Заголовки найденных файлов проверяются параллельно, до загрузки
+    media_checks = {}
+    if validate_media and not partial:
+        matched_files = {closest for closest, _ in cell_results if closest}
+        media_checks = check_media_files({relative_path: os.path.join(directory_path, relative_path)
+                                          for relative_path in matched_files}, min_cover_size)
+
+    # Результаты - в порядке строк Excel: трек, затем обложка той же строки
+    debug_logger.info(f"🔄 Обрабатываем файлы из Excel, строк: {len(df)}")
+    cells['closest'] = [closest for closest, _ in cell_results]
+    cells['similarity'] = np.array([similarity for _, similarity in cell_results], dtype=float)
+    cells = cells.iloc[np.lexsort((cells['column_order'].to_numpy(), cells['position'].to_numpy()))]
+    cells = cells.reset_index(drop=True)
+    
+    similarity = cells['similarity'].to_numpy()
+    has_file = (cells['closest'].notna() & cells['closest'].astype(str).ne('')).to_numpy()
+    is_track = (cells['column'] == 'track (titel)').to_numpy()
+    perfect = similarity == 100
+    found = similarity >= 50
+
     statistics = {
-        'total_excel_tracks': 0,
-        'total_excel_covers': 0,
+        'total_excel_tracks': int(is_track.sum()),
+        'total_excel_covers': int((~is_track).sum()),
         'total_actual_files': len(actual_files),
-        'perfect_matches': 0,
-        'partial_matches': 0,
-        'no_matches': 0,
-        'tracks_processed': 0,
-        'covers_processed': 0,
+        'perfect_matches': int(perfect.sum()),
+        'partial_matches': int((found & ~perfect).sum()),
+        'no_matches': int((~found).sum()),
+        'tracks_processed': int(is_track.sum()),
+        'covers_processed': int((~is_track).sum()),
         'similarity_ranges': {
-            '90-100%': 0,
-            '80-89%': 0,
-            '50-79%': 0,
-            '0-49%': 0
+            '90-100%': int((similarity >= 90).sum()),
+            '80-89%': int(((similarity >= 80) & (similarity < 90)).sum()),
+            '50-79%': int(((similarity >= 50) & (similarity < 80)).sum()),
+            '0-49%': int((similarity < 50).sum())
         }
     }
 
-    # Создаем множества для отслеживания использованных файлов
-    used_files = set()
-    excel_files = set()
-
-    # Обрабатываем каждую строку в Excel
-    debug_logger.info("🔄 Обрабатываем файлы из Excel")
-    total_rows = len(df)
-    debug_logger.info(f"📊 Всего строк для обработки: {total_rows}")
-    
-    for index, row in df.iterrows():
-        # Логируем прогресс каждые 10 строк
-        if (index + 1) % 10 == 0 or index == 0:
-            debug_logger.debug(f"📈 Обработано строк: {index + 1}/{total_rows}")
-        # Проверяем треки
-        track_name = row['track (titel)']
-        if pd.notna(track_name) and str(track_name).strip():
-            statistics['total_excel_tracks'] += 1
-            statistics['tracks_processed'] += 1
-            normalized_track = normalize_filename(str(track_name))
-            excel_files.add(normalized_track)
-            
-            closest_track, track_similarity = find_closest_match(track_name, actual_files)
-            
-            # Категоризируем по проценту сходства
-            if track_similarity >= 90:
-                statistics['similarity_ranges']['90-100%'] += 1
-                if track_similarity == 100:
-                    statistics['perfect_matches'] += 1
-                else:
-                    statistics['partial_matches'] += 1
-            elif track_similarity >= 80:
-                statistics['similarity_ranges']['80-89%'] += 1
-                statistics['partial_matches'] += 1
-            elif track_similarity >= 50:
-                statistics['similarity_ranges']['50-79%'] += 1
-                statistics['partial_matches'] += 1
-            else:
-                statistics['similarity_ranges']['0-49%'] += 1
-                statistics['no_matches'] += 1
-            
-            if closest_track:
-                used_files.add(normalize_filename(closest_track))
-            
-            differences = find_char_differences(str(track_name), str(closest_track)) if closest_track else 'Файл не найден'
-            
-            result_entry = {
-                    'Тип файла': 'Трек',
-                    'Название в Excel': track_name,
-                    'Найден в папке': closest_track if closest_track else 'Не найден',
-                    'Ближайшее совпадение': closest_track if closest_track else '',
-                'Процент сходства': round(track_similarity, 2) if track_similarity > 0 else 0,
-                'Различия': differences,
-                'Статус': 'Точное соответствие' if track_similarity == 100 else 
-                         'Частичное соответствие' if track_similarity >= 50 else 
-                         'Не найден'
-            }
-            
-            all_results.append(result_entry)
-            
-            # Добавляем в errors_only только если есть проблемы
-            if track_similarity < 100:
-                errors_only.append(result_entry)
-                # Логируем найденную ошибку
-                if track_similarity == 0:
-                    debug_logger.warning(f"❌ Трек НЕ НАЙДЕН: '{track_name}'")
-                elif track_similarity < 50:
-                    debug_logger.warning(f"🔴 Трек низкое сходство ({track_similarity}%): '{track_name}' → '{closest_track}'")
-                elif track_similarity < 90:
-                    debug_logger.debug(f"🟡 Трек среднее сходство ({track_similarity}%): '{track_name}' → '{closest_track}'")
-
-        # Проверяем обложки
-        cover_name = row['cover (titel)']
-        if pd.notna(cover_name) and str(cover_name).strip():
-            statistics['total_excel_covers'] += 1
-            statistics['covers_processed'] += 1
-            normalized_cover = normalize_filename(str(cover_name))
-            excel_files.add(normalized_cover)
-            
-            closest_cover, cover_similarity = find_closest_match(cover_name, actual_files)
-            
-            # Категоризируем по проценту сходства
-            if cover_similarity >= 90:
-                statistics['similarity_ranges']['90-100%'] += 1
-                if cover_similarity == 100:
-                    statistics['perfect_matches'] += 1
-                else:
-                    statistics['partial_matches'] += 1
-            elif cover_similarity >= 80:
-                statistics['similarity_ranges']['80-89%'] += 1
-                statistics['partial_matches'] += 1
-            elif cover_similarity >= 50:
-                statistics['similarity_ranges']['50-79%'] += 1
-                statistics['partial_matches'] += 1
-            else:
-                statistics['similarity_ranges']['0-49%'] += 1
-                statistics['no_matches'] += 1
-            
-            if closest_cover:
-                used_files.add(normalize_filename(closest_cover))
-            
-            differences = find_char_differences(str(cover_name), str(closest_cover)) if closest_cover else 'Файл не найден'
-            
-            result_entry = {
-                    'Тип файла': 'Обложка',
-                    'Название в Excel': cover_name,
-                    'Найден в папке': closest_cover if closest_cover else 'Не найден',
-                    'Ближайшее совпадение': closest_cover if closest_cover else '',
-                'Процент сходства': round(cover_similarity, 2) if cover_similarity > 0 else 0,
-                'Различия': differences,
-                'Статус': 'Точное соответствие' if cover_similarity == 100 else 
-                         'Частичное соответствие' if cover_similarity >= 50 else 
-                         'Не найден'
-            }
-            
-            all_results.append(result_entry)
-
-            # Добавляем в errors_only только если есть проблемы
-            if cover_similarity < 100:
-                errors_only.append(result_entry)
-                # Логируем найденную ошибку
-                if cover_similarity == 0:
-                    debug_logger.warning(f"❌ Обложка НЕ НАЙДЕНА: '{cover_name}'")
-                elif cover_similarity < 50:
-                    debug_logger.warning(f"🔴 Обложка низкое сходство ({cover_similarity}%): '{cover_name}' → '{closest_cover}'")
-                elif cover_similarity < 90:
-                    debug_logger.debug(f"🟡 Обложка среднее сходство ({cover_similarity}%): '{cover_name}' → '{closest_cover}'")
-
-    # Находим неиспользованные файлы
+    # Пустая строка - файл не найден
+    closest_files = cells['closest'].where(has_file, '')
+    file_types = cells['column'].map(COLUMN_FILE_TYPES)
+    # Посимвольное сравнение - единственная построчная операция
+    differences = [find_char_differences(str(name), os.path.basename(closest)) if closest else 'Файл не найден'
+                   for name, closest in zip(cells['name'], closest_files)]
+    
+    error_mask = similarity < 100
+    media_texts = [None] * len(cells)
+    broken_count = 0
+    if validate_media:
+        media_columns = [_media_check_column(closest, media_checks) for closest in closest_files]
+        media_texts = [text for _, text in media_columns]
+        broken = np.array([media_ok is False for media_ok, _ in media_columns], dtype=bool)
+        broken_count = int(broken.sum())
+        error_mask |= broken
+    
+    match_results = [MatchResult(*values) for values in zip(file_types.tolist(), cells['name'].tolist(),
+                                                            closest_files.tolist(), similarity.tolist(),
+                                                            differences, media_texts)]
+    error_results = [result for result, is_error in zip(match_results, error_mask.tolist()) if is_error]
+    
+    # Логируем найденные ошибки
+    for file_type, name, closest, value in zip(file_types[error_mask], cells['name'][error_mask],
+                                               closest_files[error_mask], similarity[error_mask]):
+        if value == 0:
+            debug_logger.warning(f"❌ Не найден ({file_type}): '{name}'")
+        elif value < 50:
+            debug_logger.warning(f"🔴 {file_type} низкое сходство ({value}%): '{name}' → '{closest}'")
+        elif value < 90:
+            debug_logger.debug(f"🟡 {file_type} среднее сходство ({value}%): '{name}' → '{closest}'")
+
+    # Находим неиспользованные файлы (после остановки неизвестно, какие файлы понадобятся
+    # несопоставленным названиям, поэтому список не составляется)
     debug_logger.info("🔍 Ищем неиспользованные файлы в директории")
+    used_files = {normalize_filename(os.path.basename(closest)) for closest in closest_files[has_file].unique()}
     unused_files = []
-    for file in actual_files:
-        normalized_file = normalize_filename(file)
-        if normalized_file not in used_files:
-            unused_files.append({'Файл в папке': file, 'Статус': 'Не найден в Excel'})
-            debug_logger.debug(f"📁 Неиспользованный файл: '{file}'")
+    for entry in (directory_index if not partial else ()):
+        if entry.normalized not in used_files:
+            unused_files.append({'Файл в папке': entry.original, 'Статус': 'Не найден в Excel'})
+            debug_logger.debug(f"📁 Неиспользованный файл: '{entry.original}'")
     
     debug_logger.info(f"📊 Итоговая статистика обработки:")
     debug_logger.info(f"   📄 Всего файлов в Excel: {statistics['total_excel_tracks'] + statistics['total_excel_covers']}")
@@ -447,16 +624,18 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
     debug_logger.info(f"   🟡 Частичных совпадений: {statistics['partial_matches']}")
     debug_logger.info(f"   ❌ Не найдено: {statistics['no_matches']}")
     debug_logger.info(f"   📁 Неиспользованных файлов: {len(unused_files)}")
-
-    # Создаем DataFrames
-    all_results_df = pd.DataFrame(all_results)
     
-    # Для листа "Только ошибки" - если ошибок нет, добавляем сообщение
-    if len(errors_only) == 0:
-        errors_only_df = pd.DataFrame([['Все файлы из Excel найдены в директории', '', '', '', '', '', '']], 
-                                    columns=['Тип файла', 'Название в Excel', 'Найден в папке', 'Ближайшее совпадение', 'Процент сходства', 'Различия', 'Статус'])
-    else:
-        errors_only_df = pd.DataFrame(errors_only)
+    # Статистика кэша нормализации (в текущем процессе; воркеры ведут свои кэши)
+    normalize_after = normalize_cache_info()
+    normalize_stats = {
+        'hits': normalize_after['hits'] - normalize_before['hits'],
+        'misses': normalize_after['misses'] - normalize_before['misses'],
+    }
+    normalize_calls = normalize_stats['hits'] + normalize_stats['misses']
+    debug_logger.info(f"   🧮 Нормализация имен: {normalize_stats['hits']} из {normalize_calls} взяты из кэша, "
+                      f"нормализовано заново: {normalize_stats['misses']}")
+
+    error_count = int(error_mask.sum())
     
     unused_files_df = pd.DataFrame(unused_files)
     
@@ -464,44 +643,30 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
     total_files_excel = statistics['total_excel_tracks'] + statistics['total_excel_covers']
     success_rate = (statistics['perfect_matches'] / total_files_excel * 100) if total_files_excel > 0 else 0
     
-    # Создаем статистику по релизам
-    release_stats = {}
-    for index, row in df.iterrows():
-        release_name = row.get('release_name', 'Без указания релиза')
-        if pd.isna(release_name) or str(release_name).strip() == '':
-            release_name = 'Без указания релиза'
-        
-        if release_name not in release_stats:
-            release_stats[release_name] = {
-                'total_files': 0,
-                'found_files': 0,
-                'missing_files': 0
-            }
-        
-        # Подсчитываем треки для релиза
-        track_name = row['track (titel)']
-        if pd.notna(track_name) and str(track_name).strip():
-            release_stats[release_name]['total_files'] += 1
-            closest_track, track_similarity = find_closest_match(track_name, actual_files)
-            if track_similarity >= 50:  # Считаем найденным если сходство >= 50%
-                release_stats[release_name]['found_files'] += 1
-            else:
-                release_stats[release_name]['missing_files'] += 1
-        
-        # Подсчитываем обложки для релиза
-        cover_name = row['cover (titel)']
-        if pd.notna(cover_name) and str(cover_name).strip():
-            release_stats[release_name]['total_files'] += 1  
-            closest_cover, cover_similarity = find_closest_match(cover_name, actual_files)
-            if cover_similarity >= 50:  # Считаем найденным если сходство >= 50%
-                release_stats[release_name]['found_files'] += 1
-            else:
-                release_stats[release_name]['missing_files'] += 1
-    
-    # Формируем краткую сводку согласно образцу
+    # Статистика по релизам: группировка результатов по релизу строки (найден - сходство >= 50%)
+    release_stats = {release_name: {'total_files': 0, 'found_files': 0, 'missing_files': 0}
+                     for release_name in releases.unique()}
+    release_counts = pd.DataFrame({'release': releases.to_numpy()[cells['position'].to_numpy()], 'found': found})
+    release_counts = release_counts.groupby('release', sort=False)['found'].agg(['size', 'sum'])
+    for release_name, total, found_count in zip(release_counts.index, release_counts['size'], release_counts['sum']):
+        release_stats[release_name] = {
+            'total_files': int(total),
+            'found_files': int(found_count),
+            'missing_files': int(total - found_count)
+        }
+    
+    # Формируем краткую сводку согласно образцу (найденным считается округленное сходство >= 50%)
+    report_found = np.where(similarity > 0, np.round(similarity, 2), 0) >= 50
     executive_summary = [
         ['Сводка по проверке файлов', ''],
         ['', ''],
+    ]
+    if partial:
+        executive_summary += [
+            ['Проверка прервана:', f"{stop_reason}, проверено {len(cell_names)} из {total_names} названий"],
+            ['', ''],
+        ]
+    executive_summary += [
         ['Общая статистика', ''],
         ['Всего файлов в Excel:', total_files_excel],
         ['Найдено совпадений:', statistics['perfect_matches'] + statistics['partial_matches']],
@@ -509,10 +674,10 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
         ['Неиспользуемые файлы в директории:', len(unused_files)],
         ['', ''],
         ['Статистика по типам файлов', ''],
-        ['Найдено треков:', sum(1 for result in all_results if result['Тип файла'] == 'Трек' and result['Процент сходства'] >= 50)],
-        ['Найдено обложек:', sum(1 for result in all_results if result['Тип файла'] == 'Обложка' and result['Процент сходства'] >= 50)],
-        ['Отсутствующие треки:', sum(1 for result in all_results if result['Тип файла'] == 'Трек' and result['Процент сходства'] < 50)],
-        ['Отсутствующие обложки:', sum(1 for result in all_results if result['Тип файла'] == 'Обложка' and result['Процент сходства'] < 50)],
+        ['Найдено треков:', int((is_track & report_found).sum())],
+        ['Найдено обложек:', int((~is_track & report_found).sum())],
+        ['Отсутствующие треки:', int((is_track & ~report_found).sum())],
+        ['Отсутствующие обложки:', int((~is_track & ~report_found).sum())],
         ['', ''],
         ['Статистика по релизам', ''],
         ['Релиз', 'Всего файлов', 'Найдено', 'Отсутствует', 'Процент найденных']
@@ -578,7 +743,10 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
     
     # Создаем рекомендации
     recommendations = []
-    if statistics['perfect_matches'] == total_files_excel:
+    if partial:
+        recommendations.append(['⏹️ Прервано', f'{stop_reason} - проверено {len(cell_names)} из {total_names} названий, '
+                                               'перед загрузкой выполните полную проверку'])
+    if statistics['perfect_matches'] == total_files_excel and not partial:
         recommendations.append(['✅ Отлично!', 'Все файлы найдены с точным соответствием'])
     else:
         if statistics['no_matches'] > 0:
@@ -589,6 +757,11 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
             recommendations.append(['📝 Рекомендация', f'{statistics["similarity_ranges"]["50-79%"]} файлов требуют проверки названий'])
         if len(unused_files) > 0:
             recommendations.append(['📁 Информация', f'{len(unused_files)} файлов в папке не указаны в Excel'])
+        if broken_count > 0:
+            recommendations.append(['🚨 Критично', f'{broken_count} файлов повреждены или не соответствуют требованиям - замените их до загрузки'])
+        renamed_count = sum(1 for flag in content_flags if flag['Тип'] == 'Переименован')
+        if renamed_count > 0:
+            recommendations.append(['🔁 Переименование', f'{renamed_count} файлов совпадают по содержимому с ранее найденными - вероятно, их переименовали'])
         if statistics['partial_matches'] > statistics['perfect_matches']:
             recommendations.append(['🔧 Улучшение', 'Рекомендуется стандартизировать именование файлов'])
     
@@ -597,10 +770,6 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
     
     recommendations_df = pd.DataFrame(recommendations, columns=['Приоритет', 'Рекомендация'])
     
-    # Создаем имя выходного файла с текущей датой и временем
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    output_file = results_dir / f"file_comparison_results_{timestamp}.xlsx"
-    
     # Создаем папку для постоянного хранения отчетов, если её нет
     reports_archive_dir = Path(get_results_directory_path()).parent / 'verification reports'
     debug_logger.debug(f"📁 Папка архива отчетов: {reports_archive_dir}")
@@ -608,54 +777,74 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
         os.makedirs(reports_archive_dir)
         debug_logger.info("📁 Создана папка для архива отчетов")
     
-    # Путь для дубликата отчета в архиве
-    archive_output_file = reports_archive_dir / f"file_comparison_results_{timestamp}.xlsx"
+    # Имя отчета с текущей датой и временем - одно для папки results и для архива
+    report_name = _unique_report_name(datetime.now().strftime("%Y-%m-%d_%H-%M-%S"), results_dir, reports_archive_dir)
+    output_file = results_dir / report_name
+    archive_output_file = reports_archive_dir / report_name
     
     debug_logger.info("📊 Создаем расширенный отчет Excel с 5 листами")
     
-    # Функция для сохранения отчета (будем использовать дважды)
+    # Столбцы отчета с русскими названиями строятся только здесь, при записи
+    all_results_df = _report_frame(match_results, validate_media)
+    errors_only_df = _report_frame(error_results, validate_media)
+    # Для листа "Только ошибки" - если ошибок нет, добавляем сообщение
+    if len(errors_only_df) == 0:
+        no_errors_text = NO_ERRORS_MESSAGES[1] if partial else NO_ERRORS_MESSAGES[0]
+        errors_only_df = pd.DataFrame([[no_errors_text] + [''] * (len(errors_only_df.columns) - 1)],
+                                      columns=errors_only_df.columns)
+    
     def save_report_to_file(file_path):
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            # Лист 1: Все файлы (теперь первый)
-            all_results_df.to_excel(writer, index=False, sheet_name='Все файлы')
+        writer = StreamingReportWriter(file_path, REPORT_STYLES)
+        # Лист 1: Все файлы (теперь первый)
+        writer.add_sheet('Все файлы', *_all_results_sheet(all_results_df))
         
-            # Лист 2: Только ошибки (теперь второй)
-            errors_only_df.to_excel(writer, index=False, sheet_name='Только ошибки')
-            
-            # Лист 3: Краткая сводка
-            executive_summary_df.to_excel(writer, index=False, header=False, sheet_name='Краткая сводка')
-            
-            # Лист 4: Статистика
-            detailed_stats_df.to_excel(writer, index=False, header=False, sheet_name='Детальная статистика')
-            
-            # Лист 5: Рекомендации
-            recommendations_df.to_excel(writer, index=False, sheet_name='Рекомендации')
-            
-            # Лист 6: Неиспользованные файлы (если есть)
-            if len(unused_files) > 0:
-                unused_files_df.to_excel(writer, index=False, sheet_name='Неиспользованные файлы')
-            
-            # Форматирование листов
-            _format_excel_sheets(writer, all_results_df, errors_only_df, len(unused_files))
+        # Лист 2: Только ошибки (теперь второй)
+        writer.add_sheet('Только ошибки', *_errors_sheet(errors_only_df))
+        
+        # Лист 3: Краткая сводка
+        writer.add_sheet('Краткая сводка', *_executive_summary_sheet(executive_summary_df))
+        
+        # Лист 4: Статистика
+        writer.add_sheet('Детальная статистика', *_detailed_stats_sheet(detailed_stats_df))
+        
+        # Лист 5: Рекомендации
+        writer.add_sheet('Рекомендации', *_plain_sheet(recommendations_df))
+        
+        # Лист 6: Неиспользованные файлы (если есть)
+        if len(unused_files) > 0:
+            writer.add_sheet('Неиспользованные файлы', *_plain_sheet(unused_files_df, 'report_header'))
+        
+        # Лист 7: Совпадения по содержимому (если включено хэширование и что-то найдено)
+        if content_flags:
+            writer.add_sheet('Совпадения по содержимому', *_plain_sheet(pd.DataFrame(content_flags), 'report_header'))
+        writer.save()
     
     # Сохраняем отчет в основную папку results (для интерфейса)
     debug_logger.info("💾 Сохраняем отчет в папку results")
     save_report_to_file(output_file)
     
-    # Сохраняем дубликат в архивную папку (всегда, независимо от диалога сохранения)
+    # Дубликат в архивной папке (всегда, независимо от диалога сохранения) - копия готового файла
     debug_logger.info("📂 Сохраняем дубликат отчета в архивную папку")
-    save_report_to_file(archive_output_file)
+    _archive_report(output_file, archive_output_file)
     
-    error_count = len(errors_only)
     success_message = f"Найдено {error_count} файлов с различиями" if error_count > 0 else "Все файлы соответствуют записям в Excel"
+    if partial:
+        success_message = (f"{stop_reason}: проверено {len(cell_names)} из {total_names} названий, "
+                           f"с различиями: {error_count}")
     
     result = {
         'success': True,
         'message': success_message,
         'results_file': str(output_file),
         'error_count': error_count,
-        'results_data': all_results
+        'results_data': match_results,
+        'normalize_cache': normalize_stats,
+        'partial': partial
     }
+    if partial:
+        result['stop_reason'] = stop_reason
+    if content_hashing:
+        result['content_flags'] = content_flags
 
     if not result['success']:
         debug_logger.error(f"\n❌ {result['message']}")
@@ -670,11 +859,11 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
             
             # Выводим детальную информацию о файлах с ошибками
             debug_logger.info("📝 Детали файлов с ошибками:")
-            for i, error in enumerate(errors_only[:10], 1):  # Показываем первые 10 ошибок
-                file_name = error.get('Название в Excel', 'Неизвестно')
-                file_type = error.get('Тип файла', 'Неизвестно')
-                similarity = error.get('Процент сходства', 0)
-                found_file = error.get('Найден в папке', 'Не найден')
+            for i, error in enumerate(error_results[:10], 1):  # Показываем первые 10 ошибок
+                file_name = error.name
+                file_type = error.file_type
+                similarity = round(error.similarity, 2) if error.similarity > 0 else 0
+                found_file = error.closest or 'Не найден'
                 
                 if similarity == 0:
                     debug_logger.error(f"   {i}. ❌ {file_type}: '{file_name}' - НЕ НАЙДЕН")
@@ -685,281 +874,390 @@ def compare_files_with_excel(excel_file_path=None, directory_path=None):
                 else:
                     debug_logger.info(f"   {i}. 🟠 {file_type}: '{file_name}' - {similarity}% сходства с '{found_file}'")
             
-            if len(errors_only) > 10:
-                debug_logger.info(f"   ... и еще {len(errors_only) - 10} файлов с ошибками")
+            if error_count > 10:
+                debug_logger.info(f"   ... и еще {error_count - 10} файлов с ошибками")
                 
         else:
             debug_logger.success(f"🎉 Ошибок не найдено!")
 
-    return result
+    yield _result_event(result)
 
 
-def _format_excel_sheets(writer, all_results_df, errors_only_df, unused_files_count):
-    """Форматирует листы Excel для лучшего визуального восприятия"""
-    
-    # Определяем стили
-    red_fill = PatternFill(start_color='FFFF0000', end_color='FFFF0000', fill_type='solid')
-    yellow_fill = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
-    green_fill = PatternFill(start_color='90EE90', end_color='90EE90', fill_type='solid')
-    header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-    header_font = Font(color='FFFFFF', bold=True)
-    bold_font = Font(bold=True)
+def _unique_report_name(timestamp, results_dir, archive_dir):
+    """
+    Имя файла отчета, которого еще нет ни в папке results, ни в архиве
     
-    # Форматируем лист "Краткая сводка"
-    if 'Краткая сводка' in writer.sheets:
-        ws = writer.sheets['Краткая сводка']
-        
-        # Определяем специальные строки для форматирования
-        section_headers = ['Сводка по проверке файлов', 'Общая статистика', 'Статистика по типам файлов', 'Статистика по релизам']
-        table_header = ['Релиз', 'Всего файлов', 'Найдено', 'Отсутствует', 'Процент найденных']
-        
-        # Форматируем заголовки разделов и таблицу
-        for row_idx, row in enumerate(ws.iter_rows(), 1):
-            for col_idx, cell in enumerate(row, 1):
-                if cell.value:
-                    # Главный заголовок
-                    if cell.value == 'Сводка по проверке файлов':
-                        cell.font = Font(bold=True, size=14)
-                        cell.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-                        cell.font = Font(color='FFFFFF', bold=True, size=14)
-                    
-                    # Заголовки разделов
-                    elif cell.value in section_headers[1:]:
-                        cell.font = Font(bold=True, size=12)
-                        cell.fill = PatternFill(start_color='D9E2F3', end_color='D9E2F3', fill_type='solid')
-                    
-                    # Заголовок таблицы релизов
-                    elif isinstance(cell.value, str) and cell.value in table_header:
-                        cell.font = Font(bold=True)
-                        cell.fill = PatternFill(start_color='E2EFDA', end_color='E2EFDA', fill_type='solid')
-                        # Применяем форматирование ко всей строке заголовка таблицы
-                        for c in range(1, 6):  # 5 колонок в таблице релизов
-                            header_cell = ws.cell(row=row_idx, column=c)
-                            header_cell.font = Font(bold=True)
-                            header_cell.fill = PatternFill(start_color='E2EFDA', end_color='E2EFDA', fill_type='solid')
-        
-        # Устанавливаем ширину столбцов
-        ws.column_dimensions['A'].width = 35  # Названия релизов или описания
-        ws.column_dimensions['B'].width = 15  # Всего файлов
-        ws.column_dimensions['C'].width = 15  # Найдено
-        ws.column_dimensions['D'].width = 15  # Отсутствует  
-        ws.column_dimensions['E'].width = 18  # Процент найденных
-    
-    # Форматируем лист "Все файлы"
-    if 'Все файлы' in writer.sheets and len(all_results_df) > 0:
-        ws = writer.sheets['Все файлы']
-        
-        # Определяем дополнительные цвета для градации
-        perfect_green = PatternFill(start_color='00FF00', end_color='00FF00', fill_type='solid')  # Ярко-зеленый для 100%
-        good_green = PatternFill(start_color='90EE90', end_color='90EE90', fill_type='solid')     # Светло-зеленый для 90-99%
-        orange_fill = PatternFill(start_color='FFA500', end_color='FFA500', fill_type='solid')   # Оранжевый для 80-89%
-        light_orange = PatternFill(start_color='FFD700', end_color='FFD700', fill_type='solid')  # Светло-оранжевый для 50-79%
-        light_red = PatternFill(start_color='FFB6C1', end_color='FFB6C1', fill_type='solid')     # Светло-красный для 1-49%
-        dark_red = PatternFill(start_color='FF0000', end_color='FF0000', fill_type='solid')      # Темно-красный для 0%
-        
-        # Заголовки
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-        
-        # Выделяем строки цветом в зависимости от процента сходства
-        for row in range(2, len(all_results_df) + 2):
+    Время в имени с точностью до секунды: при нескольких проверках за одну
+    секунду к имени добавляется номер. Файл в папке results создается сразу
+    (пустым), чтобы одновременная проверка не выбрала то же имя. Существующий
+    отчет никогда не перезаписывается - он может быть жесткой ссылкой на
+    отчет в архиве.
+    """
+    counter = 1
+    while True:
+        suffix = f"_{counter}" if counter > 1 else ""
+        report_name = f"file_comparison_results_{timestamp}{suffix}.xlsx"
+        if not (Path(archive_dir) / report_name).exists():
             try:
-                similarity = ws.cell(row=row, column=5).value  # Колонка с процентом сходства
-                
-                # Определяем цвет в зависимости от процента сходства
-                if similarity == 100:
-                    # Идеальное совпадение - ярко-зеленый
-                    fill_color = perfect_green
-                elif similarity >= 90:
-                    # Очень хорошее совпадение - светло-зеленый
-                    fill_color = good_green
-                elif similarity >= 80:
-                    # Хорошее совпадение - оранжевый
-                    fill_color = orange_fill
-                elif similarity >= 50:
-                    # Среднее совпадение - светло-оранжевый/золотой
-                    fill_color = light_orange
-                elif similarity > 0:
-                    # Плохое совпадение - светло-красный
-                    fill_color = light_red
-                else:
-                    # Файл не найден - темно-красный
-                    fill_color = dark_red
-                
-                # Применяем цвет ко всей строке
-                for col in range(1, 8):  # 7 колонок в таблице
-                    cell = ws.cell(row=row, column=col)
-                    cell.fill = fill_color
-                    
-                    # Дополнительно выделяем процент сходства жирным шрифтом если < 100%
-                    if col == 5 and similarity < 100:  # Колонка с процентом сходства
-                        cell.font = Font(bold=True)
-                        
-            except Exception as e:
-                debug_logger.debug(f"⚠️ Ошибка форматирования строки {row}: {e}")
+                with open(Path(results_dir) / report_name, 'x'):
+                    return report_name
+            except FileExistsError:
                 pass
+        counter += 1
+
+def _archive_report(report_file, archive_file):
+    """
+    Помещает готовый отчет в архив без повторной записи
+    
+    Отчет после создания не изменяется, поэтому по возможности создается
+    жесткая ссылка; если файловая система ее не поддерживает (или архив на
+    другом диске), файл копируется. Файл, уже лежащий в архиве под этим
+    именем, заменяется, а не перезаписывается на месте.
+    """
+    if os.path.lexists(archive_file) and not (os.path.exists(archive_file)
+                                             and os.path.samefile(report_file, archive_file)):
+        os.unlink(archive_file)
+    try:
+        os.link(report_file, archive_file)
+        debug_logger.debug(f"🔗 Отчет добавлен в архив жесткой ссылкой: {archive_file}")
+    except FileExistsError:
+        # Та же ссылка уже в архиве
+        debug_logger.debug(f"🔗 Отчет уже в архиве: {archive_file}")
+    except OSError:
+        try:
+            shutil.copy2(report_file, archive_file)
+            debug_logger.debug(f"📄 Отчет скопирован в архив: {archive_file}")
+        except shutil.SameFileError:
+            debug_logger.debug(f"🔗 Отчет уже в архиве: {archive_file}")
+
+def _media_check_column(closest, media_checks):
+    """
+    Значение столбца 'Проверка файла' для найденного файла
+    
+    Returns:
+        tuple: (результат проверки - True/False/None, текст для отчета)
+    """
+    if not closest:
+        return None, 'Не проверялся'
+    media_ok, description = media_checks.get(closest, (None, 'Не проверялся'))
+    if media_ok is None:
+        return None, description
+    return media_ok, f"{'✅' if media_ok else '❌'} {description}"
+
+def _find_content_flags(directory_path, scanned_files, cell_names, cell_results):
+    """
+    Находит файлы с одинаковым содержимым и переименованные файлы
+    
+    Переименованным считается файл, содержимое которого в прошлых проверках
+    точно совпадало с названием из Excel, которое сейчас не найдено точно.
+    
+    Returns:
+        list: Строки для листа 'Совпадения по содержимому'
+    """
+    content_index = ContentHashIndex(get_content_hash_cache_path())
+    digests = content_index.hash_files(
+        directory_path,
+        [(scanned.relative_path, scanned.path, scanned.size, scanned.mtime_ns) for scanned in scanned_files]
+    )
+    
+    flags = []
+    for digest, files in content_index.duplicate_groups(digests):
+        for duplicate in files[1:]:
+            flags.append({'Тип': 'Дубликат содержимого', 'Файл в папке': duplicate,
+                          'Связано с': files[0], 'Хэш BLAKE2': digest})
+    
+    files_by_digest = {}
+    for relative_path, digest in digests.items():
+        files_by_digest.setdefault(digest, []).append(relative_path)
+    digests_by_title = {}
+    for digest, title in content_index.titles.items():
+        digests_by_title.setdefault(title, []).append(digest)
+    
+    matched_titles = {}
+    for name, (closest, similarity) in zip(cell_names, cell_results):
+        title = normalize_filename(name)
+        if similarity >= 100:
+            if closest in digests:
+                matched_titles[digests[closest]] = title
+            continue
+        for digest in digests_by_title.get(title, ()):
+            for relative_path in files_by_digest.get(digest, ()):
+                if relative_path != closest:
+                    flags.append({'Тип': 'Переименован', 'Файл в папке': relative_path,
+                                  'Связано с': name, 'Хэш BLAKE2': digest})
+    
+    content_index.remember_titles(matched_titles)
+    content_index.save()
+    debug_logger.info(f"#️⃣ Совпадения по содержимому: {len(flags)}")
+    return flags
+
+class LiveComparison:
+    """
+    Проверка файлов, которая поддерживается в актуальном состоянии при изменениях директории
+    
+    Держит в памяти индекс директории и совпадения всех названий из Excel.
+    Изменения директории (от DirectoryWatcher) пересчитывают только
+    затронутые ими названия, без повторного чтения Excel и записи отчета.
+    """
+    
+    def __init__(self, excel_file_path, directory_path, similarity_floor=SIMILARITY_FLOOR, prefilter=DEFAULT_PREFILTER,
+                 scan_depth=DEFAULT_SCAN_DEPTH, ignore_patterns=DEFAULT_IGNORE_PATTERNS, scorer=DEFAULT_SCORER):
+        """
+        Raises:
+            ValueError: Если в Excel файле нет необходимых столбцов или алгоритм сходства неизвестен
+            OSError: Если директорию не удалось прочитать
+        """
+        self.excel_file_path = excel_file_path
+        self.directory_path = directory_path
+        self.scan_depth = scan_depth
+        self.ignore_patterns = ignore_patterns
         
-        # Добавляем легенду цветов в конце таблицы
-        legend_start_row = len(all_results_df) + 4  # Отступ от основной таблицы
-        
-        # Заголовок легенды
-        legend_header = ws.cell(row=legend_start_row, column=1)
-        legend_header.value = "Легенда цветов (по проценту сходства):"
-        legend_header.font = Font(bold=True, size=12)
-        
-        # Элементы легенды
-        legend_items = [
-            ("100% - Идеальное совпадение", perfect_green),
-            ("90-99% - Очень хорошее совпадение", good_green),
-            ("80-89% - Хорошее совпадение", orange_fill),
-            ("50-79% - Среднее совпадение", light_orange),
-            ("1-49% - Плохое совпадение", light_red),
-            ("0% - Файл не найден", dark_red)
-        ]
-        
-        for i, (text, color) in enumerate(legend_items):
-            row_num = legend_start_row + 1 + i
-            cell = ws.cell(row=row_num, column=1)
-            cell.value = text
-            cell.fill = color
-            cell.font = Font(bold=True)
-            
-            # Объединяем ячейки для лучшего вида легенды
-            ws.merge_cells(f'A{row_num}:C{row_num}')
-        
-        # Автоширина столбцов
-        for column in ws.columns:
-            max_length = 0
-            column = [cell for cell in column]
-            for cell in column:
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column[0].column_letter].width = adjusted_width
-    
-    # Форматируем лист "Только ошибки" (оригинальная логика)
-    if 'Только ошибки' in writer.sheets and len(errors_only_df) > 0:
-        ws = writer.sheets['Только ошибки']
-        
-        # Заголовки
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-        
-        # Проверяем, есть ли это сообщение об отсутствии ошибок
-        success_message_row = None
-        for row_idx in range(2, len(errors_only_df) + 2):
-            cell_value = ws.cell(row=row_idx, column=1).value
-            if cell_value == 'Все файлы из Excel найдены в директории':
-                success_message_row = row_idx
-                break
-        
-        if success_message_row:
-            # Форматируем сообщение об успехе
-            success_cell = ws.cell(row=success_message_row, column=1)
-            success_cell.font = Font(bold=True, size=12, color='008000')  # Зелёный цвет
-            success_cell.fill = PatternFill(start_color='E8F5E8', end_color='E8F5E8', fill_type='solid')  # Светло-зелёный фон
-            
-            # Объединяем ячейки для сообщения на всю строку
-            ws.merge_cells(f'A{success_message_row}:G{success_message_row}')
-        else:
-            # Выделяем строки цветом в зависимости от процента сходства (только если есть ошибки)
-            for row in range(2, len(errors_only_df) + 2):
-                try:
-                    similarity = ws.cell(row=row, column=5).value  # Колонка с процентом сходства
-                    if similarity < 50:
-                        for col in range(1, 8):
-                            ws.cell(row=row, column=col).fill = red_fill
-                    elif similarity < 80:
-                        for col in range(1, 8):
-                            ws.cell(row=row, column=col).fill = yellow_fill
-                except:
-                    pass
-        
-        # Автоширина столбцов
-        for column in ws.columns:
-            max_length = 0
-            column = [cell for cell in column]
-            for cell in column:
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column[0].column_letter].width = adjusted_width
-    
-    # Форматируем лист "Детальная статистика"
-    if 'Детальная статистика' in writer.sheets:
-        ws = writer.sheets['Детальная статистика']
+        df = load_manifest(excel_file_path, REQUIRED_COLUMNS, MANIFEST_SHEET_NAME)
+        if not all(col in df.columns for col in REQUIRED_COLUMNS):
+            raise ValueError(f"В Excel файле отсутствуют необходимые столбцы: {REQUIRED_COLUMNS}")
+        _, cell_names = _collect_manifest_cells(df, REQUIRED_COLUMNS)
         
-        # Ищем строку с JWT токеном менеджера и форматируем её
-        for row_idx, row in enumerate(ws.iter_rows(), 1):
-            for col_idx, cell in enumerate(row, 1):
-                if cell.value == 'JWT токен менеджера':
-                    # Форматируем всю строку с JWT токеном менеджера
-                    for c in range(1, 4):  # 3 колонки в детальной статистике
-                        token_cell = ws.cell(row=row_idx, column=c)
-                        token_cell.font = Font(bold=True, size=11)
-                        token_cell.fill = PatternFill(start_color='FFE4B5', end_color='FFE4B5', fill_type='solid')  # Светло-оранжевый фон
-                    break
+        scanned_files = scan_directory(directory_path, scan_depth, ignore_patterns, with_stat=True)
+        self.directory_files = [scanned.relative_path for scanned in scanned_files]
+        directory_index = DirectoryIndex(self.directory_files)
         
-        # Автоширина столбцов
-        for column in ws.columns:
-            max_length = 0
-            column = [cell for cell in column]
-            for cell in column:
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column[0].column_letter].width = adjusted_width
-    
-    # Форматируем лист "Рекомендации"
-    if 'Рекомендации' in writer.sheets:
-        ws = writer.sheets['Рекомендации']
+        # Сразу после проверки кэш совпадений актуален - начальные результаты берем из него
+        results = cached_match_filenames(cell_names, directory_index, directory_path,
+                                         _directory_snapshot(scanned_files), get_match_cache_path(),
+                                         similarity_floor, prefilter=prefilter, scorer=get_scorer(scorer).name)
+        self.matcher = IncrementalMatcher(cell_names, directory_index, similarity_floor, prefilter, results,
+                                          scorer=scorer)
+        debug_logger.info(f"👀 Проверка в режиме наблюдения: {len(cell_names)} названий, {len(directory_index)} файлов")
+    
+    def apply_changes(self, added=(), removed=()):
+        """
+        Применяет изменения директории и возвращает обновленную сводку
         
-        # Автоширина столбцов
-        for column in ws.columns:
-            max_length = 0
-            column = [cell for cell in column]
-            for cell in column:
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column[0].column_letter].width = adjusted_width
-    
-    # Форматируем лист неиспользованных файлов если есть
-    if unused_files_count > 0 and 'Неиспользованные файлы' in writer.sheets:
-        ws = writer.sheets['Неиспользованные файлы']
+        Args:
+            added: Относительные пути появившихся файлов
+            removed: Относительные пути удаленных файлов
         
-        # Заголовки
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
+        Returns:
+            dict: Сводка как в summary() с измененными строками
+        """
+        changed_rows = self.matcher.apply_changes(added, removed)
+        return self.summary(changed_rows)
+    
+    def summary(self, changed_rows=()):
+        """
+        Текущее состояние проверки
         
-        # Автоширина столбцов
-        for column in ws.columns:
-            max_length = 0
-            column = [cell for cell in column]
-            for cell in column:
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column[0].column_letter].width = adjusted_width
+        Returns:
+            dict: 'success', 'message', 'error_count' (как в compare_files_with_excel)
+                и 'changed' - измененные названия с новыми совпадениями
+        """
+        error_count = sum(1 for _, similarity in self.matcher.results if similarity < 100)
+        changed = []
+        for row in changed_rows:
+            closest, similarity = self.matcher.results[row]
+            changed.append({
+                'Название в Excel': self.matcher.filenames[row],
+                'Найден в папке': closest if closest else 'Не найден',
+                'Процент сходства': round(similarity, 2) if similarity > 0 else 0,
+            })
+        return {
+            'success': True,
+            'message': f"Найдено {error_count} файлов с различиями" if error_count > 0 else "Все файлы соответствуют записям в Excel",
+            'error_count': error_count,
+            'changed': changed
+        }
+
+def _sheet_values(frame):
+    """Значения DataFrame для записи в лист: пропуски (NaN) заменяются на None - пустые ячейки"""
+    return frame.astype(object).where(frame.notna(), None)
+
+def _frame_rows(values, styles=None):
+    """Строки данных листа в виде пар (значения, стиль); styles - стиль каждой строки или None"""
+    if styles is None:
+        for row in values.itertuples(index=False, name=None):
+            yield row, None
+    else:
+        yield from zip(values.itertuples(index=False, name=None), styles)
+
+def _autofit_widths(frame, header=True, extra_rows=()):
+    """
+    Ширины столбцов по самому длинному значению (как автоподбор Excel, но не шире MAX_COLUMN_WIDTH)
+    
+    Длины считаются по исходному DataFrame векторными строковыми операциями,
+    до записи листа; пустые значения (NaN, None, '', 0) не учитываются.
+    
+    Args:
+        frame: Данные листа
+        header: Учитывать заголовки столбцов
+        extra_rows: Дополнительные строки листа после данных (например, легенда)
+    
+    Returns:
+        dict: номер столбца (с 1) -> ширина
+    """
+    widths = {}
+    for position, (name, column) in enumerate(frame.items()):
+        filled = column[column.notna() & column.astype(bool)]
+        if pd.api.types.is_numeric_dtype(filled):
+            # Различных чисел (процентов сходства, счетчиков) мало - переводим в строки только их
+            filled = pd.Series(filled.unique())
+        max_length = int(filled.astype(str).str.len().max()) if len(filled) else 0
+        if header and name:
+            max_length = max(max_length, len(str(name)))
+        for row in extra_rows:
+            if position < len(row) and row[position]:
+                max_length = max(max_length, len(str(row[position])))
+        widths[position + 1] = min(max_length + 2, MAX_COLUMN_WIDTH)
+    return widths
+
+def _similarity_rules(frame, levels, bold_below_100=False):
+    """
+    Правила условного форматирования строк таблицы по столбцу 'Процент сходства'
+    
+    Правила задаются на весь диапазон данных, поэтому их количество не зависит
+    от количества строк.
+    
+    Args:
+        frame: Данные листа (первая строка данных - вторая строка листа)
+        levels: Пары (цвет заливки, условие с {0} вместо ячейки процента сходства)
+        bold_below_100: Выделять процент сходства меньше 100% жирным шрифтом
+    
+    Returns:
+        list: Пары (диапазон, правило) для StreamingReportWriter.add_sheet
+    """
+    column = get_column_letter(frame.columns.get_loc('Процент сходства') + 1)
+    last_row = len(frame) + 1
+    data_range = f'A2:{get_column_letter(len(frame.columns))}{last_row}'
+    # Абсолютный столбец и относительная строка: условие каждой строки смотрит на свою ячейку
+    similarity_cell = f'${column}2'
+    rules = [(data_range, FormulaRule(formula=[condition.format(similarity_cell)], fill=_solid_fill(color)))
+             for color, condition in levels]
+    if bold_below_100:
+        rules.append((f'{column}2:{column}{last_row}',
+                      FormulaRule(formula=[f'{similarity_cell}<100'], font=Font(bold=True))))
+    return rules
+
+def _all_results_sheet(frame):
+    """
+    Лист 'Все файлы': строки окрашены по проценту сходства, под таблицей - легенда цветов
+    
+    Returns:
+        tuple: (строки, ширины столбцов, объединенные диапазоны, условное форматирование)
+            для StreamingReportWriter.add_sheet
+    """
+    if len(frame) == 0:
+        return _plain_sheet(frame)[0], None, (), ()
+    
+    values = _sheet_values(frame)
+    rules = _similarity_rules(frame, [(color, condition) for _, color, condition, _ in SIMILARITY_LEVELS],
+                              bold_below_100=True)
+    
+    # Легенда цветов - через две пустые строки после таблицы
+    legend_start_row = len(frame) + 4
+    legend_rows = [(['Легенда цветов (по проценту сходства):'], 'legend_title')]
+    legend_rows += [([text], name) for name, _, _, text in SIMILARITY_LEVELS]
+    merged_ranges = [f'A{row}:C{row}' for row in range(legend_start_row + 1, legend_start_row + len(legend_rows))]
+    
+    def rows():
+        yield list(frame.columns), 'report_header'
+        yield from _frame_rows(values)
+        yield [], None
+        yield [], None
+        yield from legend_rows
+    
+    widths = _autofit_widths(frame, extra_rows=[row for row, _ in legend_rows])
+    return rows(), widths, merged_ranges, rules
+
+def _errors_sheet(frame):
+    """
+    Лист 'Только ошибки': строки с низким сходством выделены красным, со средним - желтым;
+    если ошибок нет - сообщение на всю строку
+    
+    Returns:
+        tuple: (строки, ширины столбцов, объединенные диапазоны, условное форматирование)
+            для StreamingReportWriter.add_sheet
+    """
+    values = _sheet_values(frame)
+    no_errors_rows = np.flatnonzero(frame.iloc[:, 0].isin(NO_ERRORS_MESSAGES).to_numpy())
+    if len(no_errors_rows):
+        message_row = int(no_errors_rows[0])
+        styles = [['no_errors'] if index == message_row else None for index in range(len(frame))]
+        # Номер строки листа: заголовок - первая строка; сообщение - на все столбцы листа
+        # (с проверкой медиа их на один больше)
+        last_column = get_column_letter(len(frame.columns))
+        merged_ranges = [f'A{message_row + 2}:{last_column}{message_row + 2}']
+        rules = []
+    else:
+        styles = None
+        merged_ranges = []
+        rules = _similarity_rules(frame, ERROR_LEVELS)
+    
+    def rows():
+        yield list(frame.columns), 'report_header'
+        yield from _frame_rows(values, styles)
+    
+    return rows(), _autofit_widths(frame), merged_ranges, rules
+
+def _executive_summary_sheet(frame):
+    """
+    Лист 'Краткая сводка' (без заголовков столбцов): выделены главный заголовок,
+    заголовки разделов и заголовок таблицы релизов
+    
+    Returns:
+        tuple: (строки, ширины столбцов, объединенные диапазоны, условное форматирование)
+            для StreamingReportWriter.add_sheet
+    """
+    section_headers = ['Общая статистика', 'Статистика по типам файлов', 'Статистика по релизам']
+    table_header = ['Релиз', 'Всего файлов', 'Найдено', 'Отсутствует', 'Процент найденных']
+    
+    def row_style(row):
+        styles = [None] * len(row)
+        for position, value in enumerate(row):
+            if not value:
+                continue
+            if value == 'Сводка по проверке файлов':
+                styles[position] = 'summary_title'
+            elif value in section_headers:
+                styles[position] = 'summary_section'
+            elif isinstance(value, str) and value in table_header:
+                # Оформляется вся строка заголовка таблицы (5 колонок в таблице релизов)
+                return ['summary_table_header'] * max(5, len(row))
+        return styles if any(styles) else None
+    
+    values = _sheet_values(frame)
+    rows = ((row, row_style(row)) for row in values.itertuples(index=False, name=None))
+    # Названия релизов или описания, всего файлов, найдено, отсутствует, процент найденных
+    widths = {1: 35, 2: 15, 3: 15, 4: 15, 5: 18}
+    return rows, widths, (), ()
 
+def _detailed_stats_sheet(frame):
+    """
+    Лист 'Детальная статистика' (без заголовков столбцов): выделена строка с JWT токеном менеджера
+    
+    Returns:
+        tuple: (строки, ширины столбцов, объединенные диапазоны, условное форматирование)
+            для StreamingReportWriter.add_sheet
+    """
+    values = _sheet_values(frame)
+    # 3 колонки в детальной статистике
+    rows = ((row, ['manager_token'] * 3 if 'JWT токен менеджера' in row else None)
+            for row in values.itertuples(index=False, name=None))
+    return rows, _autofit_widths(frame, header=False), (), ()
+
+def _plain_sheet(frame, header_style=None):
+    """
+    Лист-таблица без оформления строк данных
+    
+    Returns:
+        tuple: (строки, ширины столбцов, объединенные диапазоны, условное форматирование)
+            для StreamingReportWriter.add_sheet
+    """
+    values = _sheet_values(frame)
+    
+    def rows():
+        yield list(frame.columns), header_style
+        yield from _frame_rows(values)
+    
+    return rows(), _autofit_widths(frame), (), ()
 
 def print_debug_info(filename, normalized_filename):
     """Выводит отладочную информацию о нормализации файла"""
@@ -967,6 +1265,74 @@ def print_debug_info(filename, normalized_filename):
     debug_logger.debug(f"🔧 Нормализованный файл: '{normalized_filename}'")
 
 
+def benchmark_scorers(excel_file_path, directory_path, scorers=None, similarity_floor=SIMILARITY_FLOOR,
+                      prefilter=DEFAULT_PREFILTER, scan_depth=DEFAULT_SCAN_DEPTH,
+                      ignore_patterns=DEFAULT_IGNORE_PATTERNS):
+    """
+    Сравнивает алгоритмы оценки сходства на реальном Excel и директории
+    
+    Для каждого алгоритма названия сопоставляются в одном процессе без кэша.
+    Измеряется скорость (названий в секунду) и доля названий, для которых
+    найден тот же файл, что и алгоритмом difflib.
+    
+    Args:
+        scorers: Имена алгоритмов (по умолчанию - все зарегистрированные)
+    
+    Returns:
+        dict: 'success', 'message' и 'results' - список словарей по алгоритмам
+    """
+    from similarity_backends import SCORERS
+    
+    scorer_names = list(scorers) if scorers else list(SCORERS)
+    try:
+        scorer_names = [get_scorer(name).name for name in scorer_names]
+        df = load_manifest(excel_file_path, REQUIRED_COLUMNS, MANIFEST_SHEET_NAME)
+        if not all(col in df.columns for col in REQUIRED_COLUMNS):
+            raise ValueError(f"В Excel файле отсутствуют необходимые столбцы: {REQUIRED_COLUMNS}")
+        actual_files = [scanned.relative_path for scanned in scan_directory(directory_path, scan_depth, ignore_patterns)]
+    except (OSError, ValueError) as e:
+        debug_logger.error(f"❌ Ошибка подготовки сравнения алгоритмов: {str(e)}")
+        return {'success': False, 'message': str(e), 'results': []}
+    _, cell_names = _collect_manifest_cells(df, REQUIRED_COLUMNS)
+    
+    # Эталон для доли совпадений - исходный алгоритм
+    if DEFAULT_SCORER not in scorer_names:
+        scorer_names.insert(0, DEFAULT_SCORER)
+    elif scorer_names[0] != DEFAULT_SCORER:
+        scorer_names.remove(DEFAULT_SCORER)
+        scorer_names.insert(0, DEFAULT_SCORER)
+    
+    debug_logger.info(f"⏱️ Сравнение алгоритмов сходства: {len(cell_names)} названий, {len(actual_files)} файлов")
+    results = []
+    reference = None
+    for name in scorer_names:
+        # Новый индекс для каждого алгоритма - ленивые структуры строятся в замере у всех одинаково
+        directory_index = DirectoryIndex(actual_files)
+        started = time.perf_counter()
+        matches = match_filenames(cell_names, directory_index, similarity_floor, prefilter=prefilter, scorer=name)
+        elapsed = time.perf_counter() - started
+        if reference is None:
+            reference = matches
+        agreement = (sum(1 for (closest, _), (expected, _) in zip(matches, reference) if closest == expected)
+                     / len(cell_names) * 100) if cell_names else 100.0
+        results.append({
+            'scorer': name,
+            'seconds': round(elapsed, 4),
+            'names_per_second': round(len(cell_names) / elapsed, 1) if elapsed > 0 else 0,
+            'agreement': round(agreement, 2),
+            'exact_matches': sum(1 for _, similarity in matches if similarity >= 100),
+        })
+    
+    debug_logger.info(f"{'Алгоритм':<14}{'Время, с':>10}{'Назв./с':>12}{'Как difflib':>14}{'100%':>8}")
+    for result in results:
+        debug_logger.info(f"{result['scorer']:<14}{result['seconds']:>10.3f}{result['names_per_second']:>12.1f}"
+                          f"{result['agreement']:>13.2f}%{result['exact_matches']:>8}")
+    return {
+        'success': True,
+        'message': f"Сравнено алгоритмов: {len(results)} на {len(cell_names)} названиях",
+        'results': results
+    }
+
 def compare_files_interactive():
     """Интерактивная версия для запуска из командной строки"""
     # Получаем абсолютный путь к директории скрипта
@@ -986,4 +1352,10 @@ def compare_files_interactive():
 
 
 if __name__ == "__main__":
-    compare_files_interactive()
+    if len(sys.argv) >= 4 and sys.argv[1] == '--benchmark':
+        # python compare_files.py --benchmark <excel> <директория> [алгоритм ...]
+        benchmark = benchmark_scorers(sys.argv[2], sys.argv[3], sys.argv[4:] or None)
+        if not benchmark['success']:
+            debug_logger.error(f"❌ {benchmark['message']}")
+    else:
+        compare_files_interactive()
@@ -0,0 +1,147 @@
+"""
+Идентификация файлов по содержимому (BLAKE2)
+
+Файлы читаются крупными блоками в пуле потоков (hashlib отпускает GIL
+при хэшировании больших блоков, поэтому потоки работают параллельно).
+Хэши сохраняются в JSON-файле в директории данных с ключом
+(путь, размер, время изменения) - повторная проверка папки с
+неизмененными файлами ничего не перечитывает.
+
+В том же файле запоминается, с каким названием из Excel совпадал файл
+с данным содержимым. Это позволяет найти файлы, которые переименовали
+так, что по имени их уже не узнать.
+
+Как и match_engine, модуль не импортирует pyqt_app.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+debug_logger = logger.bind(name="content_hash")
+
+# Версия формата файла кэша хэшей
+CONTENT_HASH_CACHE_VERSION = 1
+
+# Размер блока чтения: крупные блоки - меньше системных вызовов на больших WAV/FLAC
+CONTENT_HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Количество потоков хэширования
+CONTENT_HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+# Размер хэша BLAKE2b в байтах
+CONTENT_DIGEST_SIZE = 20
+
+
+def hash_file(path, chunk_size=CONTENT_HASH_CHUNK_SIZE):
+    """Хэш BLAKE2b содержимого файла (hex)"""
+    digest = hashlib.blake2b(digest_size=CONTENT_DIGEST_SIZE)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+class ContentHashIndex:
+    """Кэш хэшей содержимого и память о названиях, с которыми совпадало содержимое"""
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.files = {}
+        self.titles = {}
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CONTENT_HASH_CACHE_VERSION:
+                self.files = data.get('files', {})
+                self.titles = data.get('titles', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            debug_logger.warning(f"⚠️ Не удалось прочитать кэш хэшей, начинаем с пустого: {str(e)}")
+
+    def hash_files(self, directory_path, files, workers=CONTENT_HASH_WORKERS):
+        """
+        Хэши содержимого файлов директории
+
+        Args:
+            directory_path: Корневая директория (записи кэша удаленных из нее файлов удаляются)
+            files: Список (ключ, путь, размер, время изменения в наносекундах)
+            workers: Количество потоков хэширования
+
+        Returns:
+            dict: ключ -> хэш (файлы, которые не удалось прочитать, пропускаются)
+        """
+        # Кэш хранит абсолютные пути: так запись не зависит от текущей директории, а
+        # удаление записей ниже сравнивает пути с абсолютным путем directory_path
+        files = [(key, os.path.abspath(path), size, mtime_ns) for key, path, size, mtime_ns in files]
+        digests = {}
+        pending = []
+        for key, path, size, mtime_ns in files:
+            cached = self.files.get(path)
+            if cached and cached[0] == size and cached[1] == mtime_ns:
+                digests[key] = cached[2]
+            else:
+                pending.append((key, path, size, mtime_ns))
+
+        if pending:
+            pending_bytes = sum(size or 0 for _, _, size, _ in pending)
+            debug_logger.info(f"#️⃣ Хэшируем {len(pending)} файлов ({pending_bytes / 1024 / 1024:.1f} МБ), "
+                              f"из кэша: {len(digests)}")
+
+            def hash_pending(item):
+                key, path, size, mtime_ns = item
+                try:
+                    return item, hash_file(path)
+                except OSError as e:
+                    debug_logger.warning(f"⚠️ Не удалось прочитать '{path}': {str(e)}")
+                    return item, None
+
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                for (key, path, size, mtime_ns), digest in executor.map(hash_pending, pending):
+                    if digest is not None:
+                        digests[key] = digest
+                        self.files[path] = [size, mtime_ns, digest]
+
+        # Файлы, которых больше нет в директории, из кэша удаляем
+        seen_paths = {path for _, path, _, _ in files}
+        prefix = os.path.join(os.path.abspath(directory_path), '')
+        for path in [path for path in self.files if path.startswith(prefix) and path not in seen_paths]:
+            del self.files[path]
+        return digests
+
+    @staticmethod
+    def duplicate_groups(digests):
+        """
+        Группы файлов с одинаковым содержимым
+
+        Returns:
+            list: Пары (хэш, список ключей файлов) для групп из двух и более файлов
+        """
+        groups = {}
+        for key, digest in digests.items():
+            groups.setdefault(digest, []).append(key)
+        return [(digest, keys) for digest, keys in groups.items() if len(keys) > 1]
+
+    def remember_titles(self, titles_by_digest):
+        """Запоминает названия из Excel, с которыми совпало содержимое (хэш -> название)"""
+        self.titles.update(titles_by_digest)
+
+    def save(self):
+        """Атомарно записывает файл кэша"""
+        temp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CONTENT_HASH_CACHE_VERSION, 'files': self.files, 'titles': self.titles},
+                          f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            debug_logger.warning(f"⚠️ Не удалось сохранить кэш хэшей: {str(e)}")
@@ -0,0 +1,174 @@
+"""
+Постоянный кэш результатов сопоставления названий между повторными проверками
+
+Кэш хранится в JSON-файле в директории данных приложения. Для каждой
+директории с файлами запоминается снимок (имя файла -> время изменения)
+и лучшее совпадение для каждого нормализованного названия из Excel.
+При повторной проверке пересчитываются только названия, которые еще не
+встречались, и названия, на результат которых повлияли изменившиеся файлы.
+
+Как и match_engine, модуль не импортирует pyqt_app.
+"""
+
+import json
+import os
+import time
+
+from loguru import logger
+
+from match_engine import (
+    MATCH_ENGINE_VERSION,
+    SIMILARITY_FLOOR,
+    DEFAULT_PREFILTER,
+    DirectoryIndex,
+    normalize_filename,
+    find_closest_match,
+    iter_match_filenames,
+)
+from similarity_backends import DEFAULT_SCORER
+
+debug_logger = logger.bind(name="match_cache")
+
+# Сколько директорий хранить в кэше - самые давние вытесняются
+MATCH_CACHE_MAX_DIRECTORIES = 10
+
+
+def _load_cache(cache_path):
+    """Читает файл кэша; поврежденный или устаревший кэш считается пустым"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {'engine_version': MATCH_ENGINE_VERSION, 'directories': {}}
+    except (OSError, ValueError) as e:
+        debug_logger.warning(f"⚠️ Не удалось прочитать кэш совпадений, начинаем с пустого: {str(e)}")
+        return {'engine_version': MATCH_ENGINE_VERSION, 'directories': {}}
+
+    if data.get('engine_version') != MATCH_ENGINE_VERSION or not isinstance(data.get('directories'), dict):
+        debug_logger.info("🔄 Версия движка сопоставления изменилась - кэш совпадений сброшен")
+        return {'engine_version': MATCH_ENGINE_VERSION, 'directories': {}}
+    return data
+
+
+def _save_cache(cache_path, data):
+    """Атомарно записывает файл кэша, оставляя только недавние директории"""
+    directories = data['directories']
+    if len(directories) > MATCH_CACHE_MAX_DIRECTORIES:
+        recent = sorted(directories, key=lambda key: directories[key].get('updated_at', 0), reverse=True)
+        data['directories'] = {key: directories[key] for key in recent[:MATCH_CACHE_MAX_DIRECTORIES]}
+
+    temp_path = f"{cache_path}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        debug_logger.warning(f"⚠️ Не удалось сохранить кэш совпадений: {str(e)}")
+
+
+def cached_match_filenames(filenames, directory_index, directory_path, snapshot, cache_path,
+                           similarity_floor=SIMILARITY_FLOOR, workers=1, prefilter=DEFAULT_PREFILTER,
+                           scorer=DEFAULT_SCORER):
+    """
+    Сопоставляет названия из Excel с файлами директории, используя кэш прошлых проверок
+
+    Returns:
+        list: Пары (найденный файл, процент сходства) в порядке filenames (см. iter_cached_match_filenames)
+    """
+    return list(iter_cached_match_filenames(filenames, directory_index, directory_path, snapshot, cache_path,
+                                            similarity_floor, workers, prefilter, scorer))
+
+
+def iter_cached_match_filenames(filenames, directory_index, directory_path, snapshot, cache_path,
+                                similarity_floor=SIMILARITY_FLOOR, workers=1, prefilter=DEFAULT_PREFILTER,
+                                scorer=DEFAULT_SCORER):
+    """
+    Сопоставляет названия из Excel с файлами директории, используя кэш прошлых проверок,
+    и отдает результаты по мере готовности
+
+    Результат совпадает с match_filenames. Сохраненное совпадение названия
+    используется повторно, если найденный файл не удален и не изменен, а
+    среди новых и измененных файлов нет не менее похожего. Остальные
+    названия сопоставляются заново со всей директорией.
+
+    Args:
+        filenames: Список названий файлов
+        directory_index: DirectoryIndex директории
+        directory_path: Путь к директории (ключ записи в кэше)
+        snapshot: Снимок директории: имя файла -> время изменения в наносекундах
+        cache_path: Путь к файлу кэша
+        similarity_floor, workers, prefilter, scorer: Параметры как в match_filenames
+
+    Yields:
+        tuple: (найденный файл, процент сходства) в порядке filenames.
+            Кэш записывается после выдачи последнего результата
+    """
+    data = _load_cache(cache_path)
+    directory_key = os.path.abspath(str(directory_path))
+    entry = data['directories'].get(directory_key)
+    # Запись, посчитанная с другим порогом или алгоритмом сходства, не подходит
+    if (entry is None or entry.get('similarity_floor') != similarity_floor
+            or entry.get('scorer', DEFAULT_SCORER) != scorer):
+        entry = {'snapshot': {}, 'matches': {}}
+    previous_snapshot = entry['snapshot']
+    cached_matches = entry['matches']
+
+    # Новые и измененные файлы (в порядке директории) и файлы, которых больше нет в прежнем виде
+    changed_files = [name for name, mtime in snapshot.items() if previous_snapshot.get(name, -1) != mtime]
+    removed_files = {name for name, mtime in previous_snapshot.items() if snapshot.get(name, -1) != mtime}
+
+    # Результат зависит только от нормализованного названия - считаем каждое один раз
+    keys = [normalize_filename(filename) for filename in filenames]
+    representatives = {}
+    for key, filename in zip(keys, filenames):
+        if key:
+            representatives.setdefault(key, filename)
+
+    changed_index = DirectoryIndex(changed_files) if changed_files and previous_snapshot else None
+    resolved = {}
+    stale = []
+    for key, filename in representatives.items():
+        cached = cached_matches.get(key)
+        if cached is None or not previous_snapshot or cached[0] in removed_files:
+            stale.append(key)
+            continue
+        cached_original, cached_similarity = cached
+        if changed_index is None:
+            resolved[key] = (cached_original, cached_similarity)
+            continue
+
+        # Лучший файл среди изменившихся - остальные файлы не меняли своего сходства
+        changed_original, changed_similarity = find_closest_match(filename, changed_index, similarity_floor,
+                                                                  prefilter=prefilter, scorer=scorer)
+        if changed_similarity > cached_similarity:
+            resolved[key] = (changed_original, changed_similarity)
+        elif changed_similarity == cached_similarity and changed_similarity > 0:
+            # При равном сходстве победитель зависит от порядка файлов - считаем заново
+            stale.append(key)
+        else:
+            resolved[key] = (cached_original, cached_similarity)
+
+    debug_logger.info(f"💾 Кэш совпадений: {len(representatives) - len(stale)} из {len(representatives)} "
+                      f"названий без пересчета, изменившихся файлов: {len(changed_files) if previous_snapshot else 'все'}")
+
+    # Устаревшие названия идут в порядке первого появления - результаты отдаются
+    # по порядку, дожидаясь пересчета только там, где он нужен
+    stale_results = zip(stale, iter_match_filenames([representatives[key] for key in stale], directory_index,
+                                                    similarity_floor, workers, prefilter, scorer))
+    for key in keys:
+        if not key:
+            yield ('', 0)
+            continue
+        while key not in resolved:
+            stale_key, result = next(stale_results)
+            resolved[stale_key] = result
+        yield resolved[key]
+
+    data['directories'][directory_key] = {
+        'similarity_floor': similarity_floor,
+        'scorer': scorer,
+        'updated_at': time.time(),
+        'snapshot': snapshot,
+        'matches': {key: list(result) for key, result in resolved.items()},
+    }
+    _save_cache(cache_path, data)
@@ -0,0 +1,1077 @@
+"""
+Движок сопоставления названий файлов из Excel с файлами в директории
+
+Модуль не импортирует pyqt_app, поэтому его функции можно запускать
+в дочерних процессах (ProcessPoolExecutor) без побочных эффектов
+инициализации приложения.
+"""
+
+import os
+import heapq
+import re
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+from loguru import logger
+
+from similarity_backends import DEFAULT_SCORER, get_scorer
+
+# NumPy нужен только для векторизованного префильтра кандидатов
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# SciPy (если установлен) ускоряет решение задачи о назначении
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    linear_sum_assignment = None
+    SCIPY_AVAILABLE = False
+
+debug_logger = logger.bind(name="match_engine")
+
+# Версия правил нормализации и оценки сходства. Увеличивается при любом изменении,
+# влияющем на результаты сопоставления, - сохраненный кэш совпадений при этом сбрасывается
+MATCH_ENGINE_VERSION = 3
+
+# Порог сходства, начиная с которого файл считается найденным (используется в отчетах).
+# Кандидаты, которые не могут достичь порога, не оцениваются полностью, поэтому
+# для строк ниже порога ближайшее совпадение может не определяться
+SIMILARITY_FLOOR = 50
+
+# Сколько кандидатов с наибольшим числом общих триграмм оценивать полностью
+FUZZY_SHORTLIST_SIZE = 20
+
+# Режимы назначения файлов строкам Excel:
+# 'greedy'  - каждое название берет свой лучший файл (файл может достаться нескольким строкам)
+# 'optimal' - глобально оптимальное назначение, каждый файл достается не более чем одной строке
+ASSIGNMENT_GREEDY = 'greedy'
+ASSIGNMENT_OPTIMAL = 'optimal'
+
+# Сколько лучших кандидатов на название учитывать при оптимальном назначении
+ASSIGNMENT_CANDIDATES = 5
+
+# Насколько кандидат может уступать лучшему совпадению названия, чтобы попасть в граф
+ASSIGNMENT_MARGIN = 20
+
+# Максимальный размер меньшей доли компоненты для точного решения без SciPy
+ASSIGNMENT_EXACT_COMPONENT_LIMIT = 400
+
+# Способы отбора кандидатов для нечеткого поиска:
+# 'trigram' - шорт-лист по общим триграммам, затем каскад оценок по остальным файлам
+# 'numpy'   - векторизованная граница сходства для всех файлов сразу, оценка по убыванию границы
+# None      - каскад оценок по всем файлам в порядке директории
+PREFILTER_TRIGRAM = 'trigram'
+PREFILTER_NUMPY = 'numpy'
+DEFAULT_PREFILTER = PREFILTER_TRIGRAM
+
+# Сколько последних нормализованных имен помнить - одни и те же имена файлов
+# директории и названия из Excel нормализуются многократно за проверку
+NORMALIZE_CACHE_SIZE = 65536
+
+# Пробелы вокруг скобок, точек и других спецсимволов
+_SPECIAL_CHAR_SPACES = re.compile(r'\s*([\(\)\[\]\{\}\.,\-_])\s*')
+_MULTIPLE_SPACES = re.compile(r'\s+')
+
+# Сходство файла, имя которого совпало с названием только по свернутому ключу
+# (кириллица/латиница, диакритика, знаки препинания) - не точное совпадение
+FOLDED_MATCH_SIMILARITY = 95.0
+
+# Транслитерация кириллицы для свернутого ключа
+_TRANSLITERATION = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'і': 'i', 'ї': 'yi', 'є': 'ye', 'ґ': 'g', 'ў': 'u',
+})
+
+# Варианты латинского написания одних и тех же звуков (применяются к обеим сторонам)
+_LATIN_VARIANTS = (('shch', 'sch'), ('kh', 'h'), ('j', 'y'), ('x', 'ks'))
+
+# Знаки препинания, подчеркивания и пробелы, схлопываемые в один пробел
+_FOLD_SEPARATORS = re.compile(r'[\W_]+')
+
+def normalize_filename(filename):
+    """Нормализует имя файла для корректного сравнения"""
+    if isinstance(filename, str):
+        return _normalize_text(filename)
+    if not filename or pd.isna(filename):
+        return ''
+    return _normalize_text(str(filename))
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_text(filename):
+    """Нормализация строки имени файла (результаты кэшируются по исходной строке)"""
+    # Убираем пробелы по краям
+    filename = filename.strip()
+    if not filename:
+        return ''
+    
+    # Нормализация Unicode
+    filename = unicodedata.normalize('NFKC', filename)
+    
+    # Обработка пробелов вокруг специальных символов
+    # Убираем пробелы перед скобками, точками и другими спецсимволами
+    filename = _SPECIAL_CHAR_SPACES.sub(r'\1', filename)
+    
+    # Заменяем множественные пробелы на один
+    filename = _MULTIPLE_SPACES.sub(' ', filename)
+    
+    # Приводим к нижнему регистру
+    filename = filename.lower()
+    
+    # Отдельно обрабатываем расширение файла
+    name, ext = os.path.splitext(filename)
+    if ext:
+        # Убираем точку из расширения для сравнения
+        ext = ext[1:] if ext.startswith('.') else ext
+        # Убираем пробелы вокруг точки расширения
+        return f"{name.strip()}.{ext.strip()}"
+    
+    return filename.strip()
+
+def fold_filename(filename):
+    """
+    Свернутый ключ имени файла для поиска одинаковых названий в разной записи
+    
+    Нормализованное имя транслитерируется с кириллицы на латиницу, из него
+    убирается диакритика, а знаки препинания схлопываются в пробел.
+    Расширение не меняется.
+    
+    Returns:
+        str: Ключ или пустая строка, если от имени ничего не осталось
+    """
+    normalized = normalize_filename(filename)
+    return _fold_normalized(normalized) if normalized else ''
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _fold_normalized(normalized):
+    """Свернутый ключ уже нормализованного имени (результаты кэшируются)"""
+    name, ext = os.path.splitext(normalized)
+    # Транслитерация до разложения Unicode: иначе 'й' и 'ё' потеряют знаки как диакритику
+    name = unicodedata.normalize('NFKD', name.translate(_TRANSLITERATION))
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    for variant, replacement in _LATIN_VARIANTS:
+        name = name.replace(variant, replacement)
+    name = _FOLD_SEPARATORS.sub(' ', name).strip()
+    return f"{name}{ext}" if name else ''
+
+def normalize_cache_info():
+    """
+    Статистика кэша нормализации имен в текущем процессе
+    
+    Returns:
+        dict: 'hits' - имен взято из кэша, 'misses' - нормализовано заново, 'size' - имен в кэше
+    """
+    info = _normalize_text.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+
+def calculate_similarity(a, b, scorer=DEFAULT_SCORER):
+    """Вычисляет процент сходства между двумя строками (scorer - имя алгоритма из similarity_backends)"""
+    if not a or not b:
+        return 0
+    
+    # Нормализуем строки перед сравнением
+    a = normalize_filename(a)
+    b = normalize_filename(b)
+    
+    # Разделяем имя и расширение
+    a_name, a_ext = os.path.splitext(a)
+    b_name, b_ext = os.path.splitext(b)
+    
+    # Если расширения разные, уменьшаем сходство
+    if a_ext.lower() != b_ext.lower():
+        return 0
+    
+    # Сравниваем только имена файлов без расширений
+    return get_scorer(scorer).score(a_name, b_name)
+
+
+def _name_trigrams(name):
+    """Множество триграмм имени с маркерами начала и конца строки"""
+    padded = f"\x02{name}\x03"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _char_overlap(a_counts, b_counts):
+    """
+    Количество общих символов двух имен с учетом повторов
+    
+    Считается так же, как в SequenceMatcher.quick_ratio(), но по заранее
+    посчитанным частотам символов.
+    """
+    return sum(min(count, b_counts.get(char, 0)) for char, count in a_counts.items())
+
+
+class IndexedFile:
+    """Файл из директории с заранее вычисленными нормализованными частями имени"""
+    
+    __slots__ = ('original', 'normalized', 'folded', 'name', 'ext', '_char_counts')
+    
+    def __init__(self, original):
+        # original может быть путем относительно директории (файл в подпапке релиза) -
+        # сравнивается только имя файла
+        self.original = original
+        self.normalized = normalize_filename(os.path.basename(original))
+        # Второй ключ - без различий в алфавите, диакритике и знаках препинания
+        self.folded = _fold_normalized(self.normalized) if self.normalized else ''
+        # Расширение в нижнем регистре (нормализация уже приводит имя к нему)
+        self.name, self.ext = os.path.splitext(self.normalized)
+        self._char_counts = None
+    
+    @property
+    def char_counts(self):
+        """Частоты символов имени (считаются при первом обращении)"""
+        if self._char_counts is None:
+            self._char_counts = Counter(self.name)
+        return self._char_counts
+
+
+class DirectoryIndex:
+    """
+    Индекс файлов директории для многократного поиска совпадений
+    
+    Каждое имя файла нормализуется и разделяется на имя и расширение один раз
+    при построении индекса, после чего индекс переиспользуется для всех строк
+    Excel в рамках одного сравнения.
+    """
+    
+    def __init__(self, file_list):
+        """
+        Args:
+            file_list: Список имен (или относительных путей) файлов директории (порядок сохраняется)
+        """
+        self.entries = [IndexedFile(original) for original in file_list]
+        
+        # Группируем файлы по расширению - файлы с другим расширением не сравниваются
+        self.by_ext = {}
+        # Нормализованное имя -> файлы с таким именем (быстрый путь точного совпадения)
+        self.exact = {}
+        # Свернутый ключ -> файлы с таким ключом (то же название в другой записи)
+        self.folded = {}
+        # Оригинальное имя -> файл (для инкрементальных изменений)
+        self.by_original = {}
+        for entry in self.entries:
+            self.by_ext.setdefault(entry.ext, []).append(entry)
+            self.exact.setdefault(entry.normalized, []).append(entry)
+            if entry.folded:
+                self.folded.setdefault(entry.folded, []).append(entry)
+            self.by_original[entry.original] = entry
+        
+        # Инвертированные триграммные индексы и матрицы частот символов
+        # строятся лениво для каждого расширения
+        self._gram_postings = {}
+        self._char_matrices = {}
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __iter__(self):
+        return iter(self.entries)
+    
+    def add(self, original):
+        """
+        Добавляет файл в конец индекса
+        
+        Returns:
+            IndexedFile или None, если файл уже есть в индексе
+        """
+        if original in self.by_original:
+            return None
+        entry = IndexedFile(original)
+        self.entries.append(entry)
+        candidates = self.by_ext.setdefault(entry.ext, [])
+        candidates.append(entry)
+        self.exact.setdefault(entry.normalized, []).append(entry)
+        if entry.folded:
+            self.folded.setdefault(entry.folded, []).append(entry)
+        self.by_original[original] = entry
+        
+        # Новый файл встает в конец списка - триграммный индекс дополняется на месте
+        postings = self._gram_postings.get(entry.ext)
+        if postings is not None:
+            for gram in _name_trigrams(entry.name):
+                postings.setdefault(gram, []).append(len(candidates) - 1)
+        self._char_matrices.pop(entry.ext, None)
+        return entry
+    
+    def remove(self, original):
+        """
+        Удаляет файл из индекса
+        
+        Returns:
+            IndexedFile или None, если файла нет в индексе
+        """
+        entry = self.by_original.pop(original, None)
+        if entry is None:
+            return None
+        self.entries.remove(entry)
+        self.by_ext[entry.ext].remove(entry)
+        same_name = self.exact[entry.normalized]
+        same_name.remove(entry)
+        if not same_name:
+            del self.exact[entry.normalized]
+        if entry.folded:
+            same_key = self.folded[entry.folded]
+            same_key.remove(entry)
+            if not same_key:
+                del self.folded[entry.folded]
+        
+        # Позиции файлов сдвинулись - индексы расширения перестроятся при следующем поиске
+        self._gram_postings.pop(entry.ext, None)
+        self._char_matrices.pop(entry.ext, None)
+        return entry
+    
+    def lookup_exact(self, normalized_filename):
+        """Возвращает первый файл с точно таким же нормализованным именем или None"""
+        entries = self.exact.get(normalized_filename)
+        return entries[0] if entries else None
+    
+    def exact_entries(self, normalized_filename):
+        """Возвращает все файлы с точно таким же нормализованным именем"""
+        return self.exact.get(normalized_filename, [])
+    
+    def lookup_folded(self, folded_filename):
+        """Возвращает первый файл с таким же свернутым ключом (см. fold_filename) или None"""
+        entries = self.folded.get(folded_filename) if folded_filename else None
+        return entries[0] if entries else None
+    
+    def folded_entries(self, folded_filename):
+        """Возвращает все файлы с таким же свернутым ключом"""
+        return self.folded.get(folded_filename, []) if folded_filename else []
+    
+    def position(self, entry):
+        """Позиция файла среди файлов его расширения (порядок директории)"""
+        return self.candidates(entry.ext).index(entry)
+    
+    def candidates(self, ext):
+        """Возвращает файлы с указанным (нормализованным) расширением"""
+        return self.by_ext.get(ext, [])
+    
+    def gram_postings(self, ext):
+        """
+        Инвертированный индекс триграмм для файлов с указанным расширением
+        
+        Returns:
+            dict: триграмма -> список позиций файлов в candidates(ext)
+        """
+        postings = self._gram_postings.get(ext)
+        if postings is None:
+            postings = {}
+            for position, entry in enumerate(self.candidates(ext)):
+                for gram in _name_trigrams(entry.name):
+                    postings.setdefault(gram, []).append(position)
+            self._gram_postings[ext] = postings
+        return postings
+    
+    def char_matrix(self, ext):
+        """
+        Матрица частот символов имен файлов с указанным расширением (NumPy)
+        
+        Имена кодируются в дополненный массив кодов символов, из которого
+        строится матрица "файл x символ алфавита директории".
+        
+        Returns:
+            tuple: (алфавит {символ: столбец}, матрица частот, массив длин имен)
+        """
+        matrix = self._char_matrices.get(ext)
+        if matrix is None:
+            names = [entry.name for entry in self.candidates(ext)]
+            lengths = np.array([len(name) for name in names], dtype=np.int64)
+            width = int(lengths.max()) if len(names) else 0
+            # Дополненный массив кодов символов; -1 - заполнитель
+            codes = np.full((len(names), width), -1, dtype=np.int64)
+            for row, name in enumerate(names):
+                codes[row, :len(name)] = [ord(char) for char in name]
+            
+            alphabet_codes, columns = np.unique(codes, return_inverse=True)
+            columns = columns.reshape(codes.shape)
+            counts = np.zeros((len(names), len(alphabet_codes)), dtype=np.int32)
+            rows = np.broadcast_to(np.arange(len(names))[:, None], codes.shape)
+            np.add.at(counts, (rows, columns), 1)
+            
+            # Столбец заполнителя не нужен
+            if len(alphabet_codes) and alphabet_codes[0] == -1:
+                alphabet_codes = alphabet_codes[1:]
+                counts = counts[:, 1:]
+            alphabet = {chr(code): column for column, code in enumerate(alphabet_codes.tolist())}
+            matrix = self._char_matrices[ext] = (alphabet, counts, lengths)
+        return matrix
+
+
+def _vectorized_overlap_bounds(index, name, ext, scorer):
+    """
+    Верхние границы сходства запроса со всеми файлами расширения по общему набору символов
+    
+    Returns:
+        numpy.ndarray: граница процента сходства для каждого файла
+    """
+    alphabet, counts, lengths = index.char_matrix(ext)
+    query = np.zeros(counts.shape[1], dtype=np.int32)
+    for char, count in Counter(name).items():
+        column = alphabet.get(char)
+        if column is not None:
+            query[column] = count
+    matches = np.minimum(counts, query).sum(axis=1)
+    return scorer.overlap_bounds(matches, len(name), lengths)
+
+
+def _find_fuzzy_matches(index, name, ext, similarity_floor=SIMILARITY_FLOOR, shortlist_size=FUZZY_SHORTLIST_SIZE,
+                        prefilter=DEFAULT_PREFILTER, limit=1, margin=None, scorer=DEFAULT_SCORER):
+    """
+    Ищет ближайшие по имени файлы среди файлов с тем же расширением
+    
+    С префильтром 'trigram' сначала оцениваются shortlist_size кандидатов с
+    наибольшим числом общих триграмм, затем остальные файлы. С префильтром
+    'numpy' граница сходства считается для всех файлов одной векторной
+    операцией, и кандидаты оцениваются по убыванию границы, пока она
+    позволяет войти в результат. Каждый кандидат проходит каскад оценок
+    от дешевой к дорогой: граница по длинам имен, граница по общему набору
+    символов и полная оценка алгоритмом scorer (для difflib - значения
+    real_quick_ratio, quick_ratio и ratio). Следующая ступень выполняется,
+    только пока кандидат еще может войти в limit лучших и достичь порога
+    similarity_floor. Поэтому результат совпадает с полным перебором для
+    всех совпадений не ниже порога.
+    
+    Если задан margin, в результат попадают только файлы, уступающие лучшему
+    не больше чем на margin процентов - порог поднимается по мере поиска.
+    
+    Returns:
+        list: Пары (IndexedFile, процент сходства), лучшие первыми
+    """
+    candidates = index.candidates(ext)
+    name_counts = Counter(name)
+    scorer = get_scorer(scorer)
+    
+    # Куча limit лучших кандидатов: (сходство, -позиция) - в вершине худший
+    top = []
+    # Лучшее найденное сходство - от него отсчитывается margin
+    best = [0]
+    
+    def can_win(bound, position):
+        """Может ли кандидат с такой верхней границей сходства войти в результат"""
+        # Нулевое сходство не считается совпадением
+        if bound < similarity_floor or bound <= 0:
+            return False
+        if margin is not None and bound < best[0] - margin:
+            return False
+        if len(top) < limit:
+            return True
+        worst_similarity, worst_position = top[0][0], -top[0][1]
+        # При равном сходстве побеждает файл, стоящий раньше в списке (как при полном переборе)
+        return bound > worst_similarity or (bound == worst_similarity and position < worst_position)
+    
+    def min_score():
+        """Наименьшее сходство, с которым кандидат еще может войти в результат"""
+        threshold = similarity_floor
+        if margin is not None:
+            threshold = max(threshold, best[0] - margin)
+        if len(top) >= limit:
+            threshold = max(threshold, top[0][0])
+        return threshold
+    
+    def consider(position):
+        entry = candidates[position]
+        if len(name) + len(entry.name):
+            # Ступень 1: граница по длинам
+            if not can_win(scorer.length_bound(len(name), len(entry.name)), position):
+                return
+            # Ступень 2: граница по общим символам
+            overlap = _char_overlap(name_counts, entry.char_counts)
+            if not can_win(scorer.overlap_bound(overlap, len(name), len(entry.name)), position):
+                return
+        # Ступень 3: полная оценка (алгоритм может прекратить ее, как только кандидат выбыл)
+        similarity = scorer.score(name, entry.name, min_score())
+        if can_win(similarity, position):
+            best[0] = max(best[0], similarity)
+            if len(top) < limit:
+                heapq.heappush(top, (similarity, -position))
+            else:
+                heapq.heapreplace(top, (similarity, -position))
+    
+    if prefilter == PREFILTER_NUMPY and NUMPY_AVAILABLE and candidates:
+        bounds = _vectorized_overlap_bounds(index, name, ext, scorer)
+        # Сортировка по убыванию границы, при равенстве - по позиции в директории
+        for position in np.lexsort((np.arange(len(bounds)), -bounds)).tolist():
+            if not can_win(bounds[position], position):
+                # Дальше границы не больше, а при равной границе позиции дальше -
+                # остальные кандидаты тоже не могут войти в результат
+                break
+            consider(position)
+    elif prefilter != PREFILTER_TRIGRAM or len(candidates) <= max(shortlist_size, limit):
+        # Небольшой список проще перебрать целиком
+        for position in range(len(candidates)):
+            consider(position)
+    else:
+        # Шорт-лист по количеству общих триграмм
+        postings = index.gram_postings(ext)
+        shared_grams = Counter()
+        for gram in _name_trigrams(name):
+            for position in postings.get(gram, ()):
+                shared_grams[position] += 1
+        shortlist = heapq.nlargest(max(shortlist_size, limit), shared_grams, key=lambda p: (shared_grams[p], -p))
+        for position in shortlist:
+            consider(position)
+        
+        # Остальные файлы проходят тот же каскад - большинство отсекается границами
+        scored = set(shortlist)
+        for position in range(len(candidates)):
+            if position not in scored:
+                consider(position)
+    
+    return [(candidates[-negative_position], similarity)
+            for similarity, negative_position in sorted(top, key=lambda item: (-item[0], -item[1]))
+            if margin is None or similarity >= best[0] - margin]
+
+
+def _find_fuzzy_match(index, name, ext, similarity_floor=SIMILARITY_FLOOR, shortlist_size=FUZZY_SHORTLIST_SIZE,
+                      prefilter=DEFAULT_PREFILTER, scorer=DEFAULT_SCORER, below_floor=True):
+    """
+    Ищет ближайший по имени файл среди файлов с тем же расширением
+    
+    Каскад оценок отсекает файлы ниже similarity_floor. Если ни один файл не
+    достиг порога и below_floor включен, поиск повторяется без порога:
+    отчет показывает ближайший файл и различия и для плохих совпадений.
+    В обоих случаях результат совпадает с полным перебором.
+    
+    Returns:
+        tuple: (IndexedFile или None, процент сходства)
+    """
+    matches = _find_fuzzy_matches(index, name, ext, similarity_floor, shortlist_size, prefilter, scorer=scorer)
+    if not matches and below_floor and similarity_floor > 0:
+        matches = _find_fuzzy_matches(index, name, ext, 0, shortlist_size, prefilter, scorer=scorer)
+    if not matches:
+        return None, 0
+    return matches[0]
+
+
+def find_closest_match(filename, file_list, similarity_floor=SIMILARITY_FLOOR, shortlist_size=FUZZY_SHORTLIST_SIZE,
+                       prefilter=DEFAULT_PREFILTER, scorer=DEFAULT_SCORER):
+    """
+    Находит самое похожее название файла и процент сходства
+    
+    Args:
+        filename: Искомое название файла
+        file_list: DirectoryIndex или список имен файлов в директории
+        similarity_floor: Порог сходства для отсечения кандидатов; если ни один файл его не достиг,
+            возвращается лучший файл ниже порога (результат всегда совпадает с полным перебором)
+        shortlist_size: Количество кандидатов из триграммного шорт-листа
+        prefilter: Способ отбора кандидатов ('trigram', 'numpy' или None)
+        scorer: Имя алгоритма оценки сходства (см. similarity_backends)
+    
+    Returns:
+        tuple: (оригинальное имя найденного файла, процент сходства)
+    """
+    if not filename or pd.isna(filename) or str(filename).strip() == '':
+        return '', 0
+    
+    normalized_filename = normalize_filename(filename)
+    if not normalized_filename:
+        return '', 0
+    
+    # Список файлов индексируем на месте - для серии поисков индекс нужно строить заранее
+    index = file_list if isinstance(file_list, DirectoryIndex) else DirectoryIndex(file_list)
+    
+    # Выводим отладочную информацию
+    debug_logger.info(f"\n🔍 Искомый файл: '{filename}'")
+    debug_logger.info(f"🔧 Нормализованный файл: '{normalized_filename}'")
+    
+    # Точное совпадение после нормализации - нечеткий поиск не нужен.
+    # Сходство 100% возможно только при равенстве нормализованных имен,
+    # поэтому первый такой файл совпадает с результатом полного перебора
+    exact_entry = index.lookup_exact(normalized_filename)
+    if exact_entry is not None:
+        debug_logger.debug(f"🎯 Точное совпадение: '{filename}' → '{exact_entry.original}'")
+        return exact_entry.original, 100.0
+    
+    # Разделяем имя и расширение искомого файла
+    filename_name, filename_ext = os.path.splitext(normalized_filename)
+    
+    # То же название в другой записи (кириллица/латиница, диакритика) находится по второму ключу.
+    # Такой файл получает FOLDED_MATCH_SIMILARITY; превзойти его может только файл с большим
+    # сходством, поэтому нечеткий поиск идет с поднятым порогом и почти все отсекается границами
+    folded_entry = index.lookup_folded(_fold_normalized(normalized_filename))
+    if folded_entry is not None:
+        entry, max_similarity = _find_fuzzy_match(index, filename_name, filename_ext,
+                                                   max(similarity_floor, FOLDED_MATCH_SIMILARITY), shortlist_size,
+                                                   prefilter, scorer, below_floor=False)
+        # При равном сходстве побеждает файл, стоящий раньше (как при полном переборе)
+        if (entry is None or max_similarity < FOLDED_MATCH_SIMILARITY
+                or (max_similarity == FOLDED_MATCH_SIMILARITY
+                    and index.position(folded_entry) < index.position(entry))):
+            debug_logger.debug(f"🔤 Совпадение по свернутому ключу: '{filename}' → '{folded_entry.original}'")
+            return folded_entry.original, FOLDED_MATCH_SIMILARITY
+    else:
+        entry, max_similarity = _find_fuzzy_match(index, filename_name, filename_ext, similarity_floor,
+                                                   shortlist_size, prefilter, scorer)
+    if entry is None:
+        return None, 0
+    
+    # Выводим информацию о найденном совпадении
+    debug_logger.debug(f"\n🎯 Найдено лучшее совпадение:")
+    debug_logger.debug(f"📝 Искомый файл     : '{filename}'")
+    debug_logger.debug(f"🔧 Нормализованный  : '{normalized_filename}'")
+    debug_logger.debug(f"📁 Найденный файл   : '{entry.original}'")
+    debug_logger.debug(f"🔧 Нормализованный  : '{entry.normalized}'")
+    debug_logger.debug(f"📊 Процент сходства : {max_similarity}%")
+    
+    return entry.original, max_similarity
+
+
+# Индекс директории в дочернем процессе - передается один раз через initializer
+_worker_index = None
+
+def _init_match_worker(directory_index):
+    """Инициализирует процесс-воркер общим индексом директории"""
+    global _worker_index
+    _worker_index = directory_index
+    # Построчные отладочные логи из воркеров не нужны - итоги логирует основной процесс
+    logger.remove()
+
+def _apply_in_worker(function, filenames, options):
+    """Применяет функцию поиска к части названий с индексом директории текущего воркера"""
+    return [function(filename, _worker_index, **options) for filename in filenames]
+
+def _iter_map_filenames(function, filenames, directory_index, workers, **options):
+    """
+    Применяет функцию поиска к каждому названию и отдает результаты по мере готовности
+    
+    При workers > 1 названия обрабатываются частями в нескольких процессах;
+    если генератор закрыть раньше времени, еще не начатые части отменяются.
+    
+    Yields:
+        Результаты function(filename, directory_index, **options) в порядке filenames
+    """
+    if workers is None or workers <= 1 or len(filenames) < 2:
+        for filename in filenames:
+            yield function(filename, directory_index, **options)
+        return
+    
+    workers = min(workers, len(filenames))
+    # Несколько частей на процесс, чтобы выровнять нагрузку между воркерами
+    chunk_size = max(1, -(-len(filenames) // (workers * 4)))
+    chunks = [filenames[i:i + chunk_size] for i in range(0, len(filenames), chunk_size)]
+    
+    debug_logger.info(f"⚙️ Параллельное сопоставление: {len(filenames)} названий, {workers} процессов, {len(chunks)} частей")
+    
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_match_worker, initargs=(directory_index,))
+    try:
+        # map сохраняет порядок частей, поэтому результаты совпадают с последовательным режимом
+        for chunk_results in executor.map(_apply_in_worker, [function] * len(chunks), chunks,
+                                          [options] * len(chunks)):
+            yield from chunk_results
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _map_filenames(function, filenames, directory_index, workers, **options):
+    """
+    Применяет функцию поиска к каждому названию, при workers > 1 - в нескольких процессах
+    
+    Returns:
+        list: Результаты function(filename, directory_index, **options) в порядке filenames
+    """
+    return list(_iter_map_filenames(function, filenames, directory_index, workers, **options))
+
+def _resolve_scorer(scorer):
+    """Проверяет, что алгоритм оценки сходства зарегистрирован (ошибка - до запуска воркеров)"""
+    return get_scorer(scorer).name
+
+def _resolve_prefilter(prefilter):
+    """Проверяет доступность выбранного префильтра"""
+    if prefilter == PREFILTER_NUMPY and not NUMPY_AVAILABLE:
+        debug_logger.warning("⚠️ NumPy не установлен - используем триграммный префильтр")
+        return PREFILTER_TRIGRAM
+    return prefilter
+
+def match_filenames(filenames, directory_index, similarity_floor=SIMILARITY_FLOOR, workers=1,
+                    prefilter=DEFAULT_PREFILTER, scorer=DEFAULT_SCORER):
+    """
+    Сопоставляет список названий из Excel с файлами директории
+    
+    Args:
+        filenames: Список названий файлов
+        directory_index: DirectoryIndex директории
+        similarity_floor: Порог сходства для нечеткого поиска
+        workers: Количество процессов; 1 - поиск в текущем процессе
+        prefilter: Способ отбора кандидатов ('trigram', 'numpy' или None)
+        scorer: Имя алгоритма оценки сходства
+    
+    Returns:
+        list: Пары (найденный файл, процент сходства) в порядке filenames
+    """
+    return list(iter_match_filenames(filenames, directory_index, similarity_floor, workers, prefilter, scorer))
+
+def iter_match_filenames(filenames, directory_index, similarity_floor=SIMILARITY_FLOOR, workers=1,
+                         prefilter=DEFAULT_PREFILTER, scorer=DEFAULT_SCORER):
+    """
+    То же, что match_filenames, но результаты отдаются по мере готовности
+    
+    Yields:
+        tuple: (найденный файл, процент сходства) в порядке filenames
+    """
+    return _iter_map_filenames(find_closest_match, filenames, directory_index, workers,
+                               similarity_floor=similarity_floor, prefilter=_resolve_prefilter(prefilter),
+                               scorer=_resolve_scorer(scorer))
+
+
+class IncrementalMatcher:
+    """
+    Результаты сопоставления названий, которые поддерживаются при изменениях директории
+    
+    Хранит индекс директории и лучшее совпадение для каждого названия.
+    При удалении файла заново сопоставляются только названия, которые
+    были с ним сопоставлены; при добавлении остальные названия сравниваются
+    только с новыми файлами. Новые файлы встают в конец индекса, поэтому
+    при равном сходстве остается прежнее совпадение.
+    """
+    
+    def __init__(self, filenames, directory_index, similarity_floor=SIMILARITY_FLOOR, prefilter=DEFAULT_PREFILTER,
+                 results=None, scorer=DEFAULT_SCORER):
+        """
+        Args:
+            filenames: Список названий файлов
+            directory_index: DirectoryIndex директории (изменяется на месте)
+            similarity_floor: Порог сходства для нечеткого поиска
+            prefilter: Способ отбора кандидатов ('trigram', 'numpy' или None)
+            results: Уже посчитанные результаты match_filenames (если есть)
+            scorer: Имя алгоритма оценки сходства
+        """
+        self.filenames = list(filenames)
+        self.index = directory_index
+        self.similarity_floor = similarity_floor
+        self.prefilter = _resolve_prefilter(prefilter)
+        self.scorer = _resolve_scorer(scorer)
+        self.results = list(results) if results is not None else match_filenames(
+            self.filenames, directory_index, similarity_floor, prefilter=self.prefilter, scorer=self.scorer)
+        
+        # Файл -> позиции названий, сопоставленных с ним
+        self._rows_by_file = {}
+        for row, (original, _) in enumerate(self.results):
+            if original:
+                self._rows_by_file.setdefault(original, set()).add(row)
+    
+    def _set_result(self, row, result):
+        """Запоминает новое совпадение названия"""
+        previous_original = self.results[row][0]
+        if previous_original:
+            rows = self._rows_by_file.get(previous_original)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del self._rows_by_file[previous_original]
+        self.results[row] = result
+        if result[0]:
+            self._rows_by_file.setdefault(result[0], set()).add(row)
+    
+    def apply_changes(self, added=(), removed=()):
+        """
+        Применяет изменения директории (переименование - удаление и добавление)
+        
+        Args:
+            added: Имена появившихся файлов
+            removed: Имена удаленных файлов
+        
+        Returns:
+            list: Позиции названий, у которых изменилось совпадение
+        """
+        affected_rows = set()
+        for original in removed:
+            if self.index.remove(original) is not None:
+                affected_rows.update(self._rows_by_file.pop(original, ()))
+        new_files = [original for original in added if self.index.add(original) is not None]
+        
+        changed_rows = []
+        for row in sorted(affected_rows):
+            result = find_closest_match(self.filenames[row], self.index, self.similarity_floor,
+                                        prefilter=self.prefilter, scorer=self.scorer)
+            if result != self.results[row]:
+                changed_rows.append(row)
+            self._set_result(row, result)
+        
+        if new_files:
+            new_index = DirectoryIndex(new_files)
+            for row, filename in enumerate(self.filenames):
+                # Точное совпадение не может уступить файлу в конце индекса
+                if row in affected_rows or self.results[row][1] >= 100:
+                    continue
+                original, similarity = find_closest_match(filename, new_index, self.similarity_floor,
+                                                          prefilter=self.prefilter, scorer=self.scorer)
+                if original and similarity > self.results[row][1]:
+                    self._set_result(row, (original, similarity))
+                    changed_rows.append(row)
+        
+        debug_logger.info(f"👀 Изменения директории: +{len(new_files)} / -{len(removed)} файлов, "
+                          f"пересчитано названий: {len(changed_rows)}")
+        return sorted(changed_rows)
+
+
+def find_candidate_matches(filename, file_list, similarity_floor=SIMILARITY_FLOOR, limit=ASSIGNMENT_CANDIDATES,
+                           margin=ASSIGNMENT_MARGIN, prefilter=DEFAULT_PREFILTER, scorer=DEFAULT_SCORER):
+    """
+    Находит несколько лучших файлов-кандидатов для названия из Excel
+    
+    Если есть файлы с точно таким же нормализованным именем, кандидатами
+    считаются только они - нечеткие совпадения для таких строк не ищутся.
+    Нечеткие кандидаты ограничены margin процентами от лучшего сходства,
+    чтобы граф назначения оставался разреженным.
+    
+    Returns:
+        list: Пары (оригинальное имя файла, процент сходства), лучшие первыми
+    """
+    if not filename or pd.isna(filename) or str(filename).strip() == '':
+        return []
+    normalized_filename = normalize_filename(filename)
+    if not normalized_filename:
+        return []
+    
+    index = file_list if isinstance(file_list, DirectoryIndex) else DirectoryIndex(file_list)
+    exact_entries = index.exact_entries(normalized_filename)
+    if exact_entries:
+        return [(entry.original, 100.0) for entry in exact_entries]
+    
+    name, ext = os.path.splitext(normalized_filename)
+    matches = _find_fuzzy_matches(index, name, ext, similarity_floor, prefilter=prefilter, limit=limit,
+                                  margin=margin, scorer=scorer)
+    folded_entries = index.folded_entries(_fold_normalized(normalized_filename))
+    if folded_entries:
+        # Файлы с тем же свернутым ключом - кандидаты со сходством не ниже FOLDED_MATCH_SIMILARITY
+        similarities = {id(entry): similarity for entry, similarity in matches}
+        merged = {id(entry): (entry, max(similarities.get(id(entry), 0), FOLDED_MATCH_SIMILARITY))
+                  for entry in folded_entries}
+        for entry, similarity in matches:
+            merged.setdefault(id(entry), (entry, similarity))
+        best = max(similarity for _, similarity in merged.values())
+        matches = sorted((item for item in merged.values() if margin is None or item[1] >= best - margin),
+                         key=lambda item: (-item[1], index.position(item[0])))[:limit]
+    return [(entry.original, similarity) for entry, similarity in matches]
+
+
+def _hungarian_max_weight(weights, columns_count):
+    """
+    Назначение максимального веса (венгерский алгоритм с потенциалами)
+    
+    Args:
+        weights: Для каждой строки словарь {столбец: вес}; строк не больше, чем столбцов
+        columns_count: Количество столбцов
+    
+    Returns:
+        list: Столбец для каждой строки (назначение на нулевой вес означает "не назначено")
+    """
+    rows_count = len(weights)
+    max_weight = max((w for row in weights for w in row.values()), default=0)
+    # Минимизируем стоимость max_weight - вес; отсутствующее ребро - вес 0
+    cost = [[max_weight - row.get(column, 0) for column in range(columns_count)] for row in weights]
+    
+    infinity = float('inf')
+    u = [0.0] * (rows_count + 1)
+    v = [0.0] * (columns_count + 1)
+    matched_row = [0] * (columns_count + 1)  # столбец -> строка (с 1), 0 - свободен
+    way = [0] * (columns_count + 1)
+    for row in range(1, rows_count + 1):
+        matched_row[0] = row
+        column0 = 0
+        min_value = [infinity] * (columns_count + 1)
+        used = [False] * (columns_count + 1)
+        while True:
+            used[column0] = True
+            row0 = matched_row[column0]
+            delta = infinity
+            column1 = 0
+            row_cost = cost[row0 - 1]
+            for column in range(1, columns_count + 1):
+                if not used[column]:
+                    current = row_cost[column - 1] - u[row0] - v[column]
+                    if current < min_value[column]:
+                        min_value[column] = current
+                        way[column] = column0
+                    if min_value[column] < delta:
+                        delta = min_value[column]
+                        column1 = column
+            for column in range(columns_count + 1):
+                if used[column]:
+                    u[matched_row[column]] += delta
+                    v[column] -= delta
+                else:
+                    min_value[column] -= delta
+            column0 = column1
+            if matched_row[column0] == 0:
+                break
+        while column0:
+            column1 = way[column0]
+            matched_row[column0] = matched_row[column1]
+            column0 = column1
+    
+    assignment = [None] * rows_count
+    for column in range(1, columns_count + 1):
+        if matched_row[column]:
+            assignment[matched_row[column] - 1] = column - 1
+    return assignment
+
+
+def _assign_component(rows, candidate_lists):
+    """
+    Оптимальное назначение файлов строкам одной связной компоненты
+    
+    Returns:
+        dict: индекс строки -> (файл, процент сходства)
+    """
+    files = []
+    file_columns = {}
+    for row in rows:
+        for original, _ in candidate_lists[row]:
+            if original not in file_columns:
+                file_columns[original] = len(files)
+                files.append(original)
+    weights = [{file_columns[original]: similarity for original, similarity in candidate_lists[row]} for row in rows]
+    
+    if min(len(rows), len(files)) > ASSIGNMENT_EXACT_COMPONENT_LIMIT:
+        # Слишком большая компонента для точного решения в чистом Python -
+        # назначаем жадно по убыванию сходства
+        debug_logger.warning(f"⚠️ Компонента {len(rows)}x{len(files)} назначается жадно")
+        edges = sorted(((similarity, -row_position, column)
+                        for row_position, row_weights in enumerate(weights)
+                        for column, similarity in row_weights.items()), reverse=True)
+        taken_rows, taken_columns, result = set(), set(), {}
+        for similarity, negative_row_position, column in edges:
+            if -negative_row_position in taken_rows or column in taken_columns:
+                continue
+            taken_rows.add(-negative_row_position)
+            taken_columns.add(column)
+            result[rows[-negative_row_position]] = (files[column], similarity)
+        return result
+    
+    if SCIPY_AVAILABLE:
+        matrix = np.zeros((len(rows), len(files)))
+        for row_position, row_weights in enumerate(weights):
+            for column, similarity in row_weights.items():
+                matrix[row_position, column] = similarity
+        row_positions, columns = linear_sum_assignment(matrix, maximize=True)
+        pairs = zip(row_positions.tolist(), columns.tolist())
+    elif len(rows) <= len(files):
+        pairs = enumerate(_hungarian_max_weight(weights, len(files)))
+    else:
+        # Строк больше, чем файлов - решаем транспонированную задачу
+        transposed = [{} for _ in files]
+        for row_position, row_weights in enumerate(weights):
+            for column, similarity in row_weights.items():
+                transposed[column][row_position] = similarity
+        pairs = ((row_position, column)
+                 for column, row_position in enumerate(_hungarian_max_weight(transposed, len(rows))))
+    
+    result = {}
+    for row_position, column in pairs:
+        similarity = weights[row_position].get(column, 0)
+        if similarity > 0:
+            result[rows[row_position]] = (files[column], similarity)
+    return result
+
+
+def assign_filenames(filenames, directory_index, similarity_floor=SIMILARITY_FLOOR, workers=1,
+                     prefilter=DEFAULT_PREFILTER, candidate_limit=ASSIGNMENT_CANDIDATES, scorer=DEFAULT_SCORER,
+                     cancel_token=None, deadline=None):
+    """
+    Глобально оптимальное назначение "один файл - одно название"
+    
+    Для каждого различного нормализованного названия отбирается до
+    candidate_limit кандидатов не ниже порога сходства, по ним строится
+    разреженный двудольный граф "название - файл". Граф разбивается на
+    связные компоненты, и в каждой решается задача о назначении
+    максимального суммарного сходства. Каждый файл достается не более чем
+    одному названию; повторы названия (например, обложка релиза в каждой
+    строке его треков) получают тот же файл.
+    
+    Назначение глобальное, поэтому частичного результата нет: отмена
+    проверяется после каждого названия при отборе кандидатов и перед каждой
+    компонентой, и при остановке функция возвращает None.
+    
+    Args:
+        cancel_token: Объект с методом is_set() (threading.Event) - запрос отмены
+        deadline: Момент time.monotonic(), после которого назначение прерывается
+    
+    Returns:
+        list | None: Пары (найденный файл, процент сходства) в порядке filenames;
+            названия без назначенного файла получают (None, 0). None - назначение прервано
+    """
+    def stopped():
+        if cancel_token is not None and cancel_token.is_set():
+            debug_logger.warning("⏹️ Назначение файлов отменено")
+            return True
+        if deadline is not None and time.monotonic() >= deadline:
+            debug_logger.warning("⏱️ Назначение файлов прервано: исчерпан бюджет времени")
+            return True
+        return False
+    
+    # Результат зависит только от нормализованного названия - вершина графа одна на название
+    keys = [normalize_filename(filename) for filename in filenames]
+    representatives = {}
+    for key, filename in zip(keys, filenames):
+        if key:
+            representatives.setdefault(key, filename)
+    titles = list(representatives)
+    
+    candidate_lists = []
+    candidate_results = _iter_map_filenames(find_candidate_matches, list(representatives.values()),
+                                            directory_index, workers, similarity_floor=similarity_floor,
+                                            limit=candidate_limit, prefilter=_resolve_prefilter(prefilter),
+                                            scorer=_resolve_scorer(scorer))
+    try:
+        for candidates in candidate_results:
+            if stopped():
+                return None
+            candidate_lists.append(candidates)
+    finally:
+        # Закрытие генератора останавливает процессы сопоставления
+        candidate_results.close()
+    
+    # Связные компоненты графа через систему непересекающихся множеств
+    parent = {}
+    
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+    
+    for row, candidates in enumerate(candidate_lists):
+        parent.setdefault(('row', row), ('row', row))
+        for original, _ in candidates:
+            file_node = ('file', original)
+            parent.setdefault(file_node, file_node)
+            row_root, file_root = find(('row', row)), find(file_node)
+            if row_root != file_root:
+                parent[file_root] = row_root
+    
+    components = {}
+    for row, candidates in enumerate(candidate_lists):
+        if candidates:
+            components.setdefault(find(('row', row)), []).append(row)
+    
+    assigned = {}
+    for rows in components.values():
+        if stopped():
+            return None
+        if len(rows) == 1:
+            # Единственное название компоненты берет лучший файл
+            assigned[rows[0]] = candidate_lists[rows[0]][0]
+        else:
+            assigned.update(_assign_component(rows, candidate_lists))
+    
+    debug_logger.info(f"🧩 Назначение файлов: {len(components)} компонент, назначено {len(assigned)} из "
+                      f"{len(titles)} различных названий ({len(filenames)} ячеек)")
+    
+    assigned_by_key = {titles[row]: result for row, result in assigned.items()}
+    results = []
+    for key in keys:
+        if not key:
+            results.append(('', 0))
+        else:
+            results.append(assigned_by_key.get(key, (None, 0)))
+    return results
@@ -0,0 +1,222 @@
+"""
+Проверка заголовков медиафайлов перед загрузкой
+
+Для каждого файла читаются только заголовки (десятки байт) через
+os.pread - без чтения аудиоданных. Проверяются WAV (RIFF/RF64: блоки
+fmt и data, обрезанный файл), FLAC (STREAMINFO), MP3 (ID3/синхрослово),
+а для обложек JPEG/PNG - размеры изображения. Файлы проверяются в
+ограниченном пуле потоков: работа упирается в ввод-вывод, а не в CPU.
+
+Как и match_engine, модуль не импортирует pyqt_app.
+"""
+
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+debug_logger = logger.bind(name="media_headers")
+
+# Количество потоков проверки - чтения мелкие, поэтому потоков больше, чем ядер
+MEDIA_CHECK_WORKERS = 16
+
+# Минимальная сторона обложки в пикселях
+COVER_MIN_SIZE = 3000
+
+# Ограничение количества блоков/сегментов, которые просматриваются в поисках нужного
+MAX_HEADER_SEGMENTS = 256
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Маркеры JPEG с размерами кадра (SOF0-SOF15, кроме DHT, JPG и DAC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class _HeaderReader:
+    """Чтение фрагментов файла по смещению без изменения позиции (pread)"""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.size = os.fstat(fd).st_size
+
+    def read(self, length, offset):
+        if hasattr(os, 'pread'):
+            return os.pread(self.fd, length, offset)
+        # Windows: у каждого потока свой дескриптор, поэтому seek безопасен
+        os.lseek(self.fd, offset, os.SEEK_SET)
+        return os.read(self.fd, length)
+
+
+def _skip_id3(reader):
+    """Смещение после тега ID3v2 (или 0, если тега нет)"""
+    header = reader.read(10, 0)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return 0
+    # Размер тега - 4 байта по 7 значимых бит
+    size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _check_wav(reader):
+    header = reader.read(12, 0)
+    if len(header) < 12 or header[:4] not in (b'RIFF', b'RF64') or header[8:12] != b'WAVE':
+        return False, "Нет заголовка RIFF/WAVE"
+    riff_size = struct.unpack('<I', header[4:8])[0]
+    # В RF64 размеры лежат в блоке ds64, а в заголовке стоит 0xFFFFFFFF
+    check_sizes = header[:4] == b'RIFF'
+    if check_sizes and riff_size + 8 > reader.size:
+        return False, f"Файл обрезан: {reader.size} из {riff_size + 8} байт"
+
+    offset = 12
+    fmt = None
+    has_data = False
+    for _ in range(MAX_HEADER_SEGMENTS):
+        if offset + 8 > reader.size or (fmt and has_data):
+            break
+        chunk = reader.read(8, offset)
+        if len(chunk) < 8:
+            break
+        chunk_id = chunk[:4]
+        chunk_size = struct.unpack('<I', chunk[4:8])[0]
+        if chunk_id == b'fmt ':
+            fmt = struct.unpack('<HHIIHH', reader.read(16, offset + 8).ljust(16, b'\0'))
+        elif chunk_id == b'data':
+            has_data = True
+            if check_sizes and offset + 8 + chunk_size > reader.size:
+                return False, "Блок data обрезан"
+        offset += 8 + chunk_size + (chunk_size & 1)
+
+    if fmt is None:
+        return False, "Нет блока fmt"
+    if not has_data:
+        return False, "Нет блока data"
+    _, channels, sample_rate, _, _, bits = fmt
+    if not channels or not sample_rate:
+        return False, "Некорректный блок fmt"
+    return True, f"WAV {sample_rate} Гц, {bits} бит, {channels} кан."
+
+
+def _check_flac(reader):
+    offset = _skip_id3(reader)
+    if reader.read(4, offset) != b'fLaC':
+        return False, "Нет сигнатуры fLaC"
+    block_header = reader.read(4, offset + 4)
+    if len(block_header) < 4 or block_header[0] & 0x7F != 0 or int.from_bytes(block_header[1:4], 'big') != 34:
+        return False, "Нет блока STREAMINFO"
+    info = reader.read(34, offset + 8)
+    if len(info) < 34:
+        return False, "Блок STREAMINFO обрезан"
+    sample_rate = int.from_bytes(info[10:13], 'big') >> 4
+    channels = ((info[12] >> 1) & 0x07) + 1
+    bits = (((info[12] & 0x01) << 4) | (info[13] >> 4)) + 1
+    if not sample_rate:
+        return False, "Некорректная частота в STREAMINFO"
+    return True, f"FLAC {sample_rate} Гц, {bits} бит, {channels} кан."
+
+
+def _check_mp3(reader):
+    frame = reader.read(2, _skip_id3(reader))
+    if len(frame) < 2 or frame[0] != 0xFF or frame[1] & 0xE0 != 0xE0:
+        return False, "Нет MPEG-кадра после заголовка"
+    return True, "MP3"
+
+
+def _image_result(kind, width, height, min_cover_size):
+    if width < min_cover_size or height < min_cover_size:
+        return False, f"Обложка {width}x{height} меньше {min_cover_size}x{min_cover_size}"
+    return True, f"{kind} {width}x{height}"
+
+
+def _check_png(reader, min_cover_size):
+    header = reader.read(24, 0)
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b'IHDR':
+        return False, "Нет заголовка PNG"
+    width, height = struct.unpack('>II', header[16:24])
+    return _image_result('PNG', width, height, min_cover_size)
+
+
+def _check_jpeg(reader, min_cover_size):
+    if reader.read(2, 0) != b'\xff\xd8':
+        return False, "Нет заголовка JPEG"
+    offset = 2
+    for _ in range(MAX_HEADER_SEGMENTS):
+        marker = reader.read(4, offset)
+        if len(marker) < 4:
+            return False, "Файл обрезан до размеров кадра"
+        if marker[0] != 0xFF:
+            return False, "Поврежденная структура JPEG"
+        code = marker[1]
+        if code == 0xFF:
+            # Заполняющий байт перед маркером
+            offset += 1
+            continue
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            offset += 2
+            continue
+        if code in JPEG_SOF_MARKERS:
+            frame = reader.read(5, offset + 4)
+            if len(frame) < 5:
+                return False, "Заголовок кадра обрезан"
+            height, width = struct.unpack('>HH', frame[1:5])
+            return _image_result('JPEG', width, height, min_cover_size)
+        if code in (0xDA, 0xD9):
+            break
+        offset += 2 + struct.unpack('>H', marker[2:4])[0]
+    return False, "Не найдены размеры кадра JPEG"
+
+
+def check_media_file(path, min_cover_size=COVER_MIN_SIZE):
+    """
+    Проверяет заголовок медиафайла
+
+    Returns:
+        tuple: (True/False - заголовок корректен, None - тип не проверяется; описание)
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in ('.wav', '.flac', '.mp3', '.jpg', '.jpeg', '.png'):
+        return None, "Тип файла не проверяется"
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    except OSError as e:
+        return False, f"Не удалось открыть файл: {e.strerror}"
+    try:
+        reader = _HeaderReader(fd)
+        if reader.size == 0:
+            return False, "Пустой файл"
+        if ext == '.wav':
+            return _check_wav(reader)
+        if ext == '.flac':
+            return _check_flac(reader)
+        if ext == '.mp3':
+            return _check_mp3(reader)
+        if ext == '.png':
+            return _check_png(reader, min_cover_size)
+        return _check_jpeg(reader, min_cover_size)
+    except (OSError, struct.error) as e:
+        return False, f"Ошибка чтения заголовка: {e}"
+    finally:
+        os.close(fd)
+
+
+def check_media_files(paths, min_cover_size=COVER_MIN_SIZE, workers=MEDIA_CHECK_WORKERS):
+    """
+    Проверяет заголовки нескольких файлов в пуле потоков
+
+    Args:
+        paths: Словарь ключ -> абсолютный путь
+        min_cover_size: Минимальная сторона обложки в пикселях
+        workers: Количество потоков
+
+    Returns:
+        dict: ключ -> (результат, описание) как в check_media_file
+    """
+    if not paths:
+        return {}
+    keys = list(paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(keys)))) as executor:
+        results = list(executor.map(lambda key: check_media_file(paths[key], min_cover_size), keys))
+    failed = sum(1 for ok, _ in results if ok is False)
+    debug_logger.info(f"🧪 Проверено заголовков: {len(keys)}, с ошибками: {failed}")
+    return dict(zip(keys, results))
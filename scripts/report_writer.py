@@ -0,0 +1,106 @@
+"""
+Потоковая запись Excel отчетов
+
+Книга создается в режиме openpyxl write_only: строки листа записываются
+в файл по мере поступления и не остаются в памяти, поэтому расход памяти
+не растет с размером отчета. Оформление задается именованными стилями,
+которые регистрируются в книге один раз; ячейка ссылается на стиль по
+имени, а не получает свои копии шрифта и заливки. Оформление, которое
+зависит от значений строк, задается правилами условного форматирования
+на весь диапазон - их количество не зависит от количества строк.
+
+В режиме write_only ширины столбцов задаются до записи строк, а
+объединения ячеек - до сохранения книги.
+
+Как и match_engine, модуль не импортирует pyqt_app.
+"""
+
+from copy import copy
+from itertools import zip_longest
+
+from loguru import logger
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+debug_logger = logger.bind(name="report_writer")
+
+
+class StreamingReportWriter:
+    """
+    Отчет Excel, листы которого записываются потоком строк
+
+    Строки листа - пары (значения, стиль), где стиль - None (без
+    оформления), имя именованного стиля для всей строки или список имен
+    по ячейкам (None - ячейка без оформления; если имен больше, чем
+    значений, оформляются и пустые ячейки).
+    """
+
+    def __init__(self, file_path, styles):
+        """
+        Args:
+            file_path: Путь к файлу отчета
+            styles: Словарь имя стиля -> параметры NamedStyle (font, fill, border, alignment, ...)
+        """
+        self.file_path = file_path
+        self.workbook = Workbook(write_only=True)
+        self._style_arrays = {}
+        for name, parameters in styles.items():
+            # Стиль без шрифта (только заливка) сохраняет шрифт книги по умолчанию
+            parameters = {'font': DEFAULT_FONT, **parameters}
+            self.workbook.add_named_style(NamedStyle(name=name, **parameters))
+
+    def add_sheet(self, title, rows, column_widths=None, merged_ranges=(), conditional_formats=()):
+        """
+        Записывает лист
+
+        Args:
+            title: Название листа
+            rows: Итерируемые пары (значения, стиль); читаются один раз
+            column_widths: Словарь номер столбца (с 1) -> ширина
+            merged_ranges: Объединяемые диапазоны ('A5:C5')
+            conditional_formats: Пары (диапазон, правило условного форматирования openpyxl)
+
+        Returns:
+            int: Количество записанных строк
+        """
+        ws = self.workbook.create_sheet(title)
+        for column, width in (column_widths or {}).items():
+            ws.column_dimensions[get_column_letter(column)].width = width
+
+        row_count = 0
+        for values, style in rows:
+            if style is None:
+                ws.append(values)
+            elif isinstance(style, str):
+                ws.append([self._cell(ws, value, style) for value in values])
+            else:
+                ws.append([self._cell(ws, value, cell_style) for value, cell_style in zip_longest(values, style)])
+            row_count += 1
+
+        for cell_range in merged_ranges:
+            ws.merged_cells.add(cell_range)
+        for cell_range, rule in conditional_formats:
+            ws.conditional_formatting.add(cell_range, rule)
+        debug_logger.debug(f"📝 Лист '{title}' записан: {row_count} строк")
+        return row_count
+
+    def _cell(self, ws, value, style):
+        if style is None:
+            return value
+        cell = WriteOnlyCell(ws, value)
+        style_array = self._style_arrays.get(style)
+        if style_array is None:
+            # Поиск именованного стиля по имени дорогой - для каждого стиля он выполняется
+            # один раз, следующие ячейки получают копию готового набора индексов стиля
+            cell.style = style
+            self._style_arrays[style] = copy(cell._style)
+        else:
+            cell._style = copy(style_array)
+        return cell
+
+    def save(self):
+        """Сохраняет книгу; после сохранения листы добавлять нельзя"""
+        self.workbook.save(self.file_path)
@@ -0,0 +1,267 @@
+"""
+Реестр алгоритмов оценки сходства имен файлов
+
+Каждый алгоритм (scorer) возвращает сходство в процентах и, если может,
+дешевые верхние границы сходства по длинам имен и по общему набору
+символов. По этим границам движок сопоставления (match_engine) отсекает
+кандидатов, не вычисляя полную оценку. Алгоритм без границ оценивает
+всех кандидатов с тем же расширением.
+
+Доступные алгоритмы:
+- 'difflib'     - difflib.SequenceMatcher.ratio() (по умолчанию)
+- 'levenshtein' - нормированное расстояние Левенштейна с отсечением по порогу
+- 'jaro_winkler' - сходство Джаро-Винклера
+- 'token_set'   - сходство наборов слов (порядок слов не важен)
+
+Модуль не импортирует pyqt_app.
+"""
+
+import re
+from difflib import SequenceMatcher
+
+# NumPy нужен только для векторизованных границ (префильтр 'numpy')
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_SCORER = 'difflib'
+
+# Разделители слов для token_set
+_TOKEN_SEPARATORS = re.compile(r'[\s_\-]+')
+
+
+class SimilarityScorer:
+    """
+    Базовый алгоритм оценки сходства
+
+    Границы по умолчанию равны 100 - кандидаты не отсекаются.
+    """
+
+    name = ''
+    description = ''
+
+    def score(self, a, b, min_score=None):
+        """
+        Сходство двух нормализованных имен без расширений в процентах
+
+        Args:
+            min_score: Если задан, алгоритм может прекратить вычисление и вернуть 0,
+                как только станет ясно, что сходство меньше min_score
+        """
+        raise NotImplementedError
+
+    def length_bound(self, a_len, b_len):
+        """Верхняя граница сходства по длинам имен"""
+        return 100.0
+
+    def overlap_bound(self, matches, a_len, b_len):
+        """Верхняя граница сходства по количеству общих символов (с учетом повторов)"""
+        return 100.0
+
+    def overlap_bounds(self, matches, a_len, b_lens):
+        """Векторная версия overlap_bound (массивы NumPy)"""
+        return np.full(len(b_lens), 100.0)
+
+
+class DifflibScorer(SimilarityScorer):
+    """SequenceMatcher.ratio() - исходный алгоритм проверки файлов"""
+
+    name = 'difflib'
+    description = 'difflib.SequenceMatcher'
+
+    def score(self, a, b, min_score=None):
+        return SequenceMatcher(None, a, b).ratio() * 100
+
+    def length_bound(self, a_len, b_len):
+        # То же значение, что real_quick_ratio()
+        return 2.0 * min(a_len, b_len) / (a_len + b_len) * 100
+
+    def overlap_bound(self, matches, a_len, b_len):
+        # То же значение, что quick_ratio()
+        length = a_len + b_len
+        if not length:
+            return 100.0
+        return 2.0 * matches / length * 100
+
+    def overlap_bounds(self, matches, a_len, b_lens):
+        total = b_lens + a_len
+        # Тот же порядок операций, что и в overlap_bound, для одинакового округления
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bounds = 2.0 * matches / total * 100
+        bounds[total == 0] = 100.0
+        return bounds
+
+
+class LevenshteinScorer(SimilarityScorer):
+    """Нормированное расстояние Левенштейна: (1 - d / max(len)) * 100"""
+
+    name = 'levenshtein'
+    description = 'Левенштейн с отсечением по порогу'
+
+    def score(self, a, b, min_score=None):
+        longest = max(len(a), len(b))
+        if not longest:
+            return 100.0
+        if min_score is None:
+            max_distance = longest
+        else:
+            # Допуск на округление, чтобы не отсечь сходство, равное min_score
+            max_distance = int((1 - min_score / 100) * longest + 1e-6)
+            if max_distance < 0 or abs(len(a) - len(b)) > max_distance:
+                return 0.0
+        distance = _bounded_levenshtein(a, b, max_distance)
+        if distance > max_distance:
+            return 0.0
+        return (1 - distance / longest) * 100
+
+    # Границы считаются по той же формуле, что и score(), с наименьшим возможным
+    # расстоянием - так округление не делает границу меньше точного значения
+
+    def length_bound(self, a_len, b_len):
+        longest = max(a_len, b_len)
+        return (1 - abs(a_len - b_len) / longest) * 100 if longest else 100.0
+
+    def overlap_bound(self, matches, a_len, b_len):
+        # Символы длинной строки, которым нет пары, требуют хотя бы одной правки
+        longest = max(a_len, b_len)
+        return (1 - (longest - matches) / longest) * 100 if longest else 100.0
+
+    def overlap_bounds(self, matches, a_len, b_lens):
+        longest = np.maximum(b_lens, a_len)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bounds = (1 - (longest - matches) / longest) * 100
+        bounds[longest == 0] = 100.0
+        return bounds
+
+
+def _bounded_levenshtein(a, b, max_distance):
+    """
+    Расстояние Левенштейна с ранним выходом
+
+    Returns:
+        int: Расстояние или max_distance + 1, если оно больше max_distance
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, a_char in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, b_char in enumerate(b, 1):
+            cost = previous[j - 1] + (a_char != b_char)
+            insertion = current[j - 1] + 1
+            deletion = previous[j] + 1
+            value = cost if cost < insertion else insertion
+            if deletion < value:
+                value = deletion
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class JaroWinklerScorer(SimilarityScorer):
+    """Сходство Джаро-Винклера (бонус за общий префикс до 4 символов)"""
+
+    name = 'jaro_winkler'
+    description = 'Джаро-Винклер'
+
+    PREFIX_SCALE = 0.1
+    MAX_PREFIX = 4
+
+    def score(self, a, b, min_score=None):
+        if a == b:
+            return 100.0
+        if not a or not b:
+            return 0.0
+        window = max(len(a), len(b)) // 2 - 1
+        if window < 0:
+            window = 0
+        b_matched = [False] * len(b)
+        a_matches = []
+        for i, char in enumerate(a):
+            for j in range(max(0, i - window), min(len(b), i + window + 1)):
+                if not b_matched[j] and b[j] == char:
+                    b_matched[j] = True
+                    a_matches.append(char)
+                    break
+        matches = len(a_matches)
+        if not matches:
+            return 0.0
+        b_matches = [char for char, matched in zip(b, b_matched) if matched]
+        transpositions = sum(1 for x, y in zip(a_matches, b_matches) if x != y) // 2
+        jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+        prefix = 0
+        for x, y in zip(a[:self.MAX_PREFIX], b[:self.MAX_PREFIX]):
+            if x != y:
+                break
+            prefix += 1
+        return (jaro + prefix * self.PREFIX_SCALE * (1 - jaro)) * 100
+
+    def _bound(self, matches, a_len, b_len):
+        if not a_len or not b_len:
+            return 100.0 if a_len == b_len else 0.0
+        # Без транспозиций и с максимальным префиксом; запас покрывает погрешность округления
+        jaro = (matches / a_len + matches / b_len + 1) / 3 if matches else 0.0
+        return (jaro + self.MAX_PREFIX * self.PREFIX_SCALE * (1 - jaro)) * 100 + 1e-9
+
+    def length_bound(self, a_len, b_len):
+        return self._bound(min(a_len, b_len), a_len, b_len)
+
+    def overlap_bound(self, matches, a_len, b_len):
+        return self._bound(matches, a_len, b_len)
+
+    def overlap_bounds(self, matches, a_len, b_lens):
+        return np.array([self._bound(int(count), a_len, int(b_len))
+                         for count, b_len in zip(matches.tolist(), b_lens.tolist())])
+
+
+class TokenSetScorer(SimilarityScorer):
+    """Сходство наборов слов: общие слова плюс различающиеся, порядок слов не важен"""
+
+    name = 'token_set'
+    description = 'Наборы слов (token set ratio)'
+
+    def score(self, a, b, min_score=None):
+        a_tokens = {token for token in _TOKEN_SEPARATORS.split(a) if token}
+        b_tokens = {token for token in _TOKEN_SEPARATORS.split(b) if token}
+        if not a_tokens and not b_tokens:
+            return 100.0
+        common = ' '.join(sorted(a_tokens & b_tokens))
+        a_combined = f"{common} {' '.join(sorted(a_tokens - b_tokens))}".strip()
+        b_combined = f"{common} {' '.join(sorted(b_tokens - a_tokens))}".strip()
+        ratios = [SequenceMatcher(None, a_combined, b_combined).ratio()]
+        if common:
+            ratios.append(SequenceMatcher(None, common, a_combined).ratio())
+            ratios.append(SequenceMatcher(None, common, b_combined).ratio())
+        return max(ratios) * 100
+
+
+SCORERS = {}
+
+
+def register_scorer(scorer):
+    """Регистрирует алгоритм оценки сходства под его именем"""
+    SCORERS[scorer.name] = scorer
+    return scorer
+
+
+def get_scorer(name=DEFAULT_SCORER):
+    """
+    Возвращает алгоритм оценки сходства по имени
+
+    Raises:
+        ValueError: Если алгоритм с таким именем не зарегистрирован
+    """
+    scorer = SCORERS.get(name or DEFAULT_SCORER)
+    if scorer is None:
+        raise ValueError(f"Неизвестный алгоритм сходства: {name}. Доступны: {', '.join(SCORERS)}")
+    return scorer
+
+
+for _scorer in (DifflibScorer(), LevenshteinScorer(), JaroWinklerScorer(), TokenSetScorer()):
+    register_scorer(_scorer)